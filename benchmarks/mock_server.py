@@ -0,0 +1,143 @@
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+
+from aiohttp import web
+
+
+# Tokens starting with this prefix are answered like expired or revoked ones
+REVOKED_PREFIX = "revoked-"
+
+# Mission ids known to get_reward_mapping
+MISSION_IDS = ("1", "19", "15", "16", "17", "18")
+
+# Answer every request after the configured latency, failing a share of them with 429 or 500
+@web.middleware
+async def fault_injection(request, handler):
+    options = request.app["options"]
+    if request.path == "/stats":
+        return await handler(request)
+
+    delay = options.latency + random.uniform(0, options.jitter)
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+    roll = random.random()
+    if roll < options.rate_limit_rate:
+        response = web.json_response({"success": False, "code": 429, "msg": "Too many requests"}, status=429)
+        response.headers["Retry-After"] = str(options.retry_after)
+    elif roll < options.rate_limit_rate + options.error_rate:
+        response = web.json_response({"success": False, "code": 500, "msg": "Internal error"}, status=500)
+    elif request.path != "/ip" and not request.headers.get("Authorization", "").startswith("Bearer "):
+        response = web.json_response({"success": False, "code": 401, "msg": "Unauthorized"}, status=401)
+    elif request.path != "/ip" and request.headers["Authorization"].startswith(f"Bearer {REVOKED_PREFIX}"):
+        # Expired or revoked tokens, for exercising account health and quarantine
+        response = web.json_response({"success": False, "code": 401, "msg": "Unauthorized"}, status=401)
+    else:
+        response = await handler(request)
+
+    stats = request.app["stats"]
+    key = f"{request.path} {response.status}"
+    stats[key] = stats.get(key, 0) + 1
+    return response
+
+# Stable fake uid for a token
+def token_uid(token):
+    return hashlib.sha1(token.encode("utf-8")).hexdigest()[:16]
+
+# Seconds after a claim until a mission can be claimed again; missions not listed are claimed once
+MISSION_COOLDOWNS = {"1": 86400, "19": 3600}
+
+# Mission list of a token; claims maps (token, mission id) to the time it was claimed
+def mission_list(token, claims, now):
+    missions = []
+    for mission_id in MISSION_IDS:
+        claimed_at = claims.get((token, mission_id))
+        cooldown = MISSION_COOLDOWNS.get(mission_id)
+        if claimed_at is None:
+            status, remain_time = "AVAILABLE", 0
+        elif cooldown and now >= claimed_at + cooldown:
+            status, remain_time = "AVAILABLE", 0
+        elif cooldown:
+            status, remain_time = "SOON", int((claimed_at + cooldown - now) * 1000)
+        else:
+            status, remain_time = "COMPLETED", 0
+        missions.append({"id": mission_id, "status": status, "remain_time": remain_time, "current_process": 1, "target_process": 1})
+    return missions
+
+# Response data of an endpoint name from DOMAIN_API, shared with the in-process stand-in of benchmarks/simulate.py
+def endpoint_data(endpoint, token, body, claims, now):
+    uid = token_uid(token)
+    if endpoint == "ACTIVATE":
+        return True
+    if endpoint == "SESSION":
+        return {
+            "uid": uid,
+            "name": f"bench-{uid[:6]}",
+            "email": f"{uid[:6]}@example.com",
+            "referral_link": f"https://app.nodepay.ai/register?ref={uid[:8]}",
+            "state": "ACTIVE",
+            "network_earning_rate": 1,
+        }
+    if endpoint == "PING":
+        return {"ip_score": 100, "version": "2.2.7"}
+    if endpoint == "EARN_INFO":
+        return {"season_name": "Season 2", "total_earning": 1000, "today_earning": 10, "current_point": 1000, "pending_point": 0}
+    if endpoint == "MISSION":
+        return mission_list(token, claims, now)
+    if endpoint == "COMPLETE_MISSION":
+        claims[(token, str((body or {}).get("mission_id")))] = now
+        return {"earned_points": 100}
+    return None
+
+def ok(data, msg="Success"):
+    return web.json_response({"success": True, "code": 0, "msg": msg, "data": data})
+
+# aiohttp handler answering one endpoint through endpoint_data
+def endpoint_handler(endpoint):
+    async def handler(request):
+        token = request.headers["Authorization"][len("Bearer "):]
+        body = await request.json() if request.method == "POST" and request.can_read_body else None
+        return ok(endpoint_data(endpoint, token, body, request.app["claims"], time.time()))
+    return handler
+
+async def ip_lookup(request):
+    return web.json_response({"ip": "127.0.0.1"})
+
+# Request counts per "path status", e.g. "/api/network/ping 200"
+async def stats(request):
+    return web.json_response(request.app["stats"])
+
+# Build the stand-in for the endpoints in DOMAIN_API plus the IP lookup
+def create_app(options):
+    app = web.Application(middlewares=[fault_injection])
+    app["options"] = options
+    app["stats"] = {}
+    app["claims"] = {}
+
+    app.router.add_post("/api/auth/active-account", endpoint_handler("ACTIVATE"))
+    app.router.add_post("/api/auth/session", endpoint_handler("SESSION"))
+    app.router.add_post("/api/network/ping", endpoint_handler("PING"))
+    app.router.add_get("/api/earn/info", endpoint_handler("EARN_INFO"))
+    app.router.add_get("/api/mission", endpoint_handler("MISSION"))
+    app.router.add_post("/api/mission/complete-mission", endpoint_handler("COMPLETE_MISSION"))
+    app.router.add_get("/ip", ip_lookup)
+    app.router.add_get("/stats", stats)
+    return app
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the Nodepay API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8400)
+    parser.add_argument("--latency", type=float, default=0.05, help="Base response latency in seconds (default: 0.05)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency of up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429 responses")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    options = parse_args()
+    web.run_app(create_app(options), host=options.host, port=options.port, access_log=None, print=None)
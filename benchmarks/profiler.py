@@ -0,0 +1,101 @@
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.run_benchmarks import ROOT, start_mock_server, bench_environment
+
+
+# Source groups the time of every profiled function is attributed to, checked in order
+COST_GROUPS = (
+    ("idle (waiting on I/O)", ("select.epoll", "select.kqueue", "selectors.py")),
+    ("headers", ("build_headers", "get_endpoint_headers")),
+    ("json", ("/json/", "codec.py", "orjson", "encode_payload")),
+    ("logging", ("loguru", "logger_setup.py", "multiprocessing", "_pickle", "posix.write")),
+    ("transport", ("curl_cffi", "session_manager.py")),
+    ("rate limit / retry", ("rate_limiter.py", "retry_policy.py")),
+    ("api_client", ("api_client.py",)),
+    ("ping_manager", ("ping_manager.py",)),
+    ("asyncio", ("/asyncio/",)),
+)
+
+def cost_group(filename, function):
+    location = f"{filename}:{function}"
+    for group, markers in COST_GROUPS:
+        if any(marker in location for marker in markers):
+            return group
+    return "other"
+
+# Own time per cost group, so the split between headers, JSON, logging and transport is visible at a glance
+def summarize_groups(stats):
+    totals = {}
+    for (filename, _, function), (_, _, own_time, _, _) in stats.stats.items():
+        group = cost_group(filename.replace(os.sep, "/"), function)
+        totals[group] = totals.get(group, 0.0) + own_time
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+def format_report(profile, snapshot, rounds, accounts_count, elapsed, top):
+    stats = pstats.Stats(profile)
+    total = sum(own_time for _, _, own_time, _, _ in stats.stats.values()) or 1.0
+
+    lines = [f"Profile of {rounds} ping rounds for {accounts_count} accounts ({elapsed:.1f}s wall time)", ""]
+    lines.append("Own time by area")
+    for group, own_time in summarize_groups(stats):
+        lines.append(f"  {group:<24} {own_time:8.3f}s  {own_time / total:6.1%}")
+
+    for sort_key, title in (("cumulative", "Top functions by cumulative time"), ("tottime", "Top functions by own time")):
+        output = io.StringIO()
+        pstats.Stats(profile, stream=output).strip_dirs().sort_stats(sort_key).print_stats(top)
+        lines += ["", title, output.getvalue().split("\n", 4)[-1].rstrip()]
+
+    ignored = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"))
+    lines += ["", "Top allocation sites (live at the end of the run)"]
+    for statistic in snapshot.filter_traces(ignored).statistics("lineno")[:top]:
+        lines.append(f"  {statistic}")
+    return "\n".join(lines) + "\n"
+
+# Ping every account for the given number of rounds under cProfile and tracemalloc, then write the report
+def run_profile(rounds, accounts_count, output, interval=10, port=8401, top=30):
+    with tempfile.TemporaryDirectory() as workdir:
+        server = start_mock_server(port, latency=0.01)
+        try:
+            # Settings are read on import, so the bot is only loaded once the environment points at the mock server
+            os.environ.update(bench_environment(port, workdir, accounts_count, interval))
+            from utils.core import shutdown
+            from utils.core.account import AccountData
+            from utils.network import ping_all_accounts
+            from utils.services import load_tokens
+            from utils.settings import setup_logging
+
+            async def ping_rounds():
+                setup_logging()
+                accounts = [AccountData(token, index) for index, token in enumerate(await load_tokens(), start=1)]
+                try:
+                    for _ in range(rounds):
+                        await ping_all_accounts(accounts)
+                finally:
+                    await shutdown()
+
+            profile = cProfile.Profile()
+            tracemalloc.start()
+            started = time.perf_counter()
+            profile.enable()
+            try:
+                asyncio.run(ping_rounds())
+            finally:
+                profile.disable()
+                elapsed = time.perf_counter() - started
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+        finally:
+            server.terminate()
+            server.wait()
+
+    report = format_report(profile, snapshot, rounds, accounts_count, elapsed, top)
+    with open(output, "w") as file:
+        file.write(report)
+    print(f"Profile report written to {os.path.relpath(output, ROOT) if output.startswith(ROOT) else output}")
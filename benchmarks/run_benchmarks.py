@@ -0,0 +1,278 @@
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(ROOT, "benchmarks", "baseline.json")
+SCENARIOS = ("activate", "ping", "process", "startup")
+
+# Result fields compared against the baseline, and whether higher is better
+COMPARED_FIELDS = {
+    "requests_per_second": True,
+    "latency_p50_ms": False,
+    "latency_p99_ms": False,
+    "peak_rss_mb": False,
+    "loop_lag_p99_ms": False,
+    "first_ping_s": False,
+}
+
+# Estimate a quantile from cumulative histogram buckets, interpolating inside the bucket like Prometheus does
+def histogram_quantile(buckets, counts, fraction):
+    total = sum(counts)
+    if not total:
+        return 0.0
+
+    rank = total * fraction
+    cumulative = 0
+    lower = 0.0
+    for bound, count in zip(buckets, counts):
+        if count and cumulative + count >= rank:
+            return lower + (bound - lower) * (rank - cumulative) / count
+        cumulative += count
+        lower = bound
+    return buckets[-1]
+
+# Sample how late the event loop wakes up compared to when it was asked to
+async def sample_loop_lag(samples, interval=0.05):
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(time.perf_counter() - started - interval, 0.0))
+
+# Run one scenario inside this process and return its measurements
+async def run_scenario(scenario, accounts_count):
+    from utils.core import process, shutdown
+    from utils.core.account import AccountData, activate_accounts
+    from utils.network import ping_all_accounts
+    from utils.services import load_tokens, add_round_listener
+    from utils.services.metrics import requests_total, request_duration, LATENCY_BUCKETS
+    from utils.settings import setup_logging
+
+    lag_samples = []
+    sampler = asyncio.create_task(sample_loop_lag(lag_samples))
+    started = time.perf_counter()
+
+    try:
+        if scenario == "process":
+            # One full cycle: activation, profile sync with claims, then a round of pings
+            round_done = asyncio.Event()
+            add_round_listener(lambda stats: round_done.set())
+            task = asyncio.create_task(process(use_proxies=False))
+            waiter = asyncio.create_task(round_done.wait())
+            await asyncio.wait([task, waiter], return_when=asyncio.FIRST_COMPLETED)
+            task.cancel()
+            waiter.cancel()
+            await asyncio.gather(task, waiter, return_exceptions=True)
+        else:
+            setup_logging()
+            accounts = [AccountData(token, index) for index, token in enumerate(await load_tokens(), start=1)]
+            if scenario == "activate":
+                await activate_accounts(accounts)
+            else:
+                await ping_all_accounts(accounts)
+    finally:
+        elapsed = time.perf_counter() - started
+        sampler.cancel()
+        await shutdown()
+
+    counts = [0] * len(LATENCY_BUCKETS)
+    for bucket_counts, _, _ in request_duration.values.values():
+        counts = [a + b for a, b in zip(counts, bucket_counts)]
+    requests = sum(requests_total.values.values())
+    errors = sum(value for (_, status), value in requests_total.values.items() if not status.startswith("2"))
+    lag_samples.sort()
+
+    return {
+        "scenario": scenario,
+        "accounts": accounts_count,
+        "requests": requests,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_second": round(requests / elapsed, 1) if elapsed else 0.0,
+        "latency_p50_ms": round(histogram_quantile(LATENCY_BUCKETS, counts, 0.5) * 1000, 1),
+        "latency_p99_ms": round(histogram_quantile(LATENCY_BUCKETS, counts, 0.99) * 1000, 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "loop_lag_p99_ms": round(lag_samples[min(int(len(lag_samples) * 0.99), len(lag_samples) - 1)] * 1000, 1) if lag_samples else 0.0,
+        "loop_lag_max_ms": round(lag_samples[-1] * 1000, 1) if lag_samples else 0.0,
+    }
+
+# Entry point of the child process running a single scenario
+def run_child(scenario, accounts_count, result_file):
+    from utils.services.runtime import install_event_loop
+
+    install_event_loop()
+    result = asyncio.run(run_scenario(scenario, accounts_count))
+    with open(result_file, "w") as file:
+        json.dump(result, file)
+
+# Pings the mock server has answered so far
+def answered_pings(port):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=1) as response:
+        stats = json.load(response)
+    return sum(count for key, count in stats.items() if key.startswith("/api/network/ping "))
+
+# Start main.py headless like a supervisor would and measure the seconds until its first ping is answered
+def measure_startup(port, env, accounts_count, timeout=120):
+    answered = answered_pings(port)
+    started = time.perf_counter()
+    bot = subprocess.Popen(
+        [sys.executable, "main.py", "--no-proxies"], cwd=ROOT, env=env,
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout and bot.poll() is None:
+            if answered_pings(port) > answered:
+                return {"scenario": "startup", "accounts": accounts_count, "first_ping_s": round(time.perf_counter() - started, 3)}
+            time.sleep(0.01)
+        return None
+    finally:
+        bot.terminate()
+        bot.wait()
+
+# Start the mock server and wait until it answers
+def start_mock_server(port, latency=0.05, jitter=0.0, error_rate=0.0, rate_limit_rate=0.0):
+    command = [
+        sys.executable, "-m", "benchmarks.mock_server", "--port", str(port),
+        "--latency", str(latency), "--jitter", str(jitter),
+        "--error-rate", str(error_rate), "--rate-limit-rate", str(rate_limit_rate),
+    ]
+    server = subprocess.Popen(command, cwd=ROOT)
+
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=1).read()
+            return server
+        except OSError:
+            time.sleep(0.2)
+
+    server.terminate()
+    raise SystemExit("Mock server did not start")
+
+# Environment pointing the bot at the mock server with synthetic tokens
+def bench_environment(port, workdir, accounts_count, interval, rate_limit=0, accelerated=False):
+    tokens_file = os.path.join(workdir, f"tokens-{accounts_count}.txt")
+    if not os.path.exists(tokens_file):
+        with open(tokens_file, "w") as file:
+            file.writelines(f"bench-token-{index:08d}-{'x' * 40}\n" for index in range(accounts_count))
+
+    mock_url = f"http://127.0.0.1:{port}"
+    return {
+        **os.environ,
+        "API_BASE_URL": mock_url,
+        "PING_BASE_URL": mock_url,
+        "IP_LOOKUP_URL": f"{mock_url}/ip",
+        "TOKENS_FILE": tokens_file,
+        "PROXIES_FILE": os.path.join(workdir, "proxies.txt"),
+        "STATE_FILE": "",
+        "METRICS_PORT": "0",
+        "LOG_MODE": "summary",
+        "LOG_FILE": os.path.join(workdir, "bench.log"),
+        "LOG_JSON_FILE": "",
+        "PING_INTERVAL": str(interval),
+        "PING_DURATION": str(interval),
+        "RATE_LIMIT_PER_HOST": str(rate_limit),
+        "ACCELERATED_RUNTIME": str(accelerated),
+    }
+
+# Print the percentage change of each compared field against the baseline
+def compare(result, baseline):
+    changes = []
+    for field, higher_is_better in COMPARED_FIELDS.items():
+        old, new = baseline.get(field), result.get(field)
+        if not old or new is None:
+            continue
+        change = (new - old) / old * 100
+        verdict = "better" if (change > 0) == higher_is_better else "worse"
+        changes.append(f"{field} {change:+.1f}% ({verdict})" if abs(change) >= 1 else f"{field} ~")
+    return ", ".join(changes)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the bot against the local mock server")
+    parser.add_argument("--accounts", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--interval", type=int, default=30, help="PING_INTERVAL and PING_DURATION used for the runs (default: 30)")
+    parser.add_argument("--rate-limit", type=float, default=0, help="RATE_LIMIT_PER_HOST for the runs (default: 0, disabled)")
+    parser.add_argument("--port", type=int, default=8400)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--accelerated", action="store_true", help="Run the bot with ACCELERATED_RUNTIME (uvloop and orjson)")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Store the results in {os.path.relpath(BASELINE_FILE, ROOT)}")
+    parser.add_argument("--child", nargs=3, metavar=("SCENARIO", "ACCOUNTS", "RESULT_FILE"), help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.child:
+        scenario, accounts_count, result_file = args.child
+        run_child(scenario, int(accounts_count), result_file)
+        return
+
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as file:
+            baseline = json.load(file)
+
+    server = start_mock_server(args.port, args.latency, args.jitter, args.error_rate, args.rate_limit_rate)
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for accounts_count in args.accounts:
+                for scenario in args.scenarios:
+                    env = bench_environment(args.port, workdir, accounts_count, args.interval, args.rate_limit, args.accelerated)
+                    key = f"{scenario}:{accounts_count}"
+
+                    if scenario == "startup":
+                        result = measure_startup(args.port, env, accounts_count)
+                        if result is None:
+                            print(f"{scenario:<9} {accounts_count:>7} accounts: no ping answered")
+                            continue
+                        results[key] = result
+                        print(f"{scenario:<9} {accounts_count:>7} accounts: first ping answered {result['first_ping_s']:.2f}s after launch")
+                        if key in baseline:
+                            print(f"{'':<9} vs baseline: {compare(result, baseline[key])}")
+                        continue
+
+                    # A fresh process per run keeps peak RSS and module state separate
+                    result_file = os.path.join(workdir, "result.json")
+                    command = [sys.executable, "-m", "benchmarks.run_benchmarks", "--child", scenario, str(accounts_count), result_file]
+                    completed = subprocess.run(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+                    if completed.returncode != 0 or not os.path.exists(result_file):
+                        print(f"{scenario:<9} {accounts_count:>7} accounts: run failed (exit code {completed.returncode})")
+                        continue
+
+                    with open(result_file) as file:
+                        result = json.load(file)
+                    os.remove(result_file)
+
+                    results[key] = result
+                    print(
+                        f"{scenario:<9} {accounts_count:>7} accounts: {result['requests']} requests ({result['errors']} errors) "
+                        f"in {result['elapsed_s']:.1f}s, {result['requests_per_second']:.0f} req/s, "
+                        f"p50/p99 {result['latency_p50_ms']:.0f}/{result['latency_p99_ms']:.0f} ms, "
+                        f"peak RSS {result['peak_rss_mb']:.0f} MB, loop lag p99/max {result['loop_lag_p99_ms']:.0f}/{result['loop_lag_max_ms']:.0f} ms"
+                    )
+                    if key in baseline:
+                        print(f"{'':<9} vs baseline: {compare(result, baseline[key])}")
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.save_baseline and results:
+        baseline.update(results)
+        with open(BASELINE_FILE, "w") as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+        print(f"Baseline saved to {os.path.relpath(BASELINE_FILE, ROOT)}")
+
+if __name__ == "__main__":
+    main()
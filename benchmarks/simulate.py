@@ -0,0 +1,167 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Response of the in-process stand-in, mirroring the parts of a curl_cffi response the bot uses
+class StandInResponse:
+    def __init__(self, status_code, payload, headers=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = headers or {}
+
+    @property
+    def content(self):
+        return json.dumps(self.payload).encode("utf-8")
+
+    @property
+    def text(self):
+        return json.dumps(self.payload)
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            from curl_cffi import requests
+            raise requests.exceptions.HTTPError(f"HTTP Error {self.status_code}", response=self)
+
+# In-process backend answering through endpoint_data and recording every request on virtual time
+class StandInBackend:
+    def __init__(self, tokens, latency=0.05, error_rate=0.0, rate_limit_rate=0.0, retry_after=1, seed=0):
+        from utils.services.api_client import ENDPOINT_NAMES
+        from utils.settings import IP_LOOKUP_URL
+
+        self.endpoint_names = {**ENDPOINT_NAMES, IP_LOOKUP_URL: "IP"}
+        self.account_indexes = {token: index for index, token in enumerate(tokens, start=1)}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.claims = {}
+
+        # (virtual seconds since start, account index, endpoint, status) per request
+        self.timeline = []
+
+    async def get(self, url, headers=None, timeout=None):
+        return await self.request(url, headers, None)
+
+    async def post(self, url, data=None, headers=None, timeout=None):
+        return await self.request(url, headers, json.loads(data) if data else None)
+
+    async def request(self, url, headers, body):
+        from benchmarks.mock_server import endpoint_data
+        from utils.services import clock
+
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+        endpoint = self.endpoint_names.get(url, "UNKNOWN")
+        token = (headers or {}).get("Authorization", "")[len("Bearer "):]
+
+        roll = self.random.random()
+        if endpoint == "IP":
+            response = StandInResponse(200, {"ip": "127.0.0.1"})
+        elif roll < self.rate_limit_rate:
+            response = StandInResponse(429, {"success": False, "code": 429}, {"Retry-After": str(self.retry_after)})
+        elif roll < self.rate_limit_rate + self.error_rate:
+            response = StandInResponse(500, {"success": False, "code": 500})
+        else:
+            data = endpoint_data(endpoint, token, body, self.claims, clock.now())
+            response = StandInResponse(200, {"success": True, "code": 0, "msg": "Success", "data": data})
+
+        self.timeline.append((round(clock.monotonic(), 3), self.account_indexes.get(token, 0), endpoint, response.status_code))
+        return response
+
+# Run process() for the given virtual duration against the stand-in and return the backend
+def simulate(tokens, hours, latency=0.05, error_rate=0.0, rate_limit_rate=0.0, seed=0):
+    from utils.core import process, shutdown
+    from utils.services.clock import run_virtual
+    from utils.services.session_manager import set_transport
+
+    # Backoff jitter draws from the global generator
+    random.seed(seed)
+    backend = StandInBackend(tokens, latency, error_rate, rate_limit_rate, seed=seed)
+    set_transport(backend)
+
+    async def run():
+        try:
+            await asyncio.wait_for(process(use_proxies=False), hours * 3600)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            await shutdown()
+
+    try:
+        run_virtual(run())
+    finally:
+        set_transport(None)
+    return backend
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the bot on a virtual clock against an in-process stand-in backend")
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--interval", type=int, default=60, help="PING_INTERVAL (default: 60)")
+    parser.add_argument("--duration", type=int, default=1800, help="PING_DURATION (default: 1800)")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeline", help="Write every request as a JSON line to this file")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="nodepay-sim-")
+    tokens = [f"sim-token-{index:08d}-{'x' * 40}" for index in range(args.accounts)]
+    tokens_file = os.path.join(workdir, "tokens.txt")
+    with open(tokens_file, "w") as file:
+        file.writelines(f"{token}\n" for token in tokens)
+
+    # Settings are read on import, so the environment is prepared before the bot is loaded
+    os.environ.update({
+        "TOKENS_FILE": tokens_file,
+        "PROXIES_FILE": os.path.join(workdir, "proxies.txt"),
+        "STATE_FILE": "",
+        "METRICS_PORT": "0",
+        "LOOP_LAG_THRESHOLD": "0",
+        "LOG_MODE": "summary",
+        "LOG_FILE": "",
+        "LOG_JSON_FILE": "",
+        "PING_INTERVAL": str(args.interval),
+        "PING_DURATION": str(args.duration),
+    })
+    sys.path.insert(0, ROOT)
+
+    started = time.perf_counter()
+    backend = simulate(tokens, args.hours, args.latency, args.error_rate, args.rate_limit_rate, args.seed)
+    elapsed = time.perf_counter() - started
+
+    counts = {}
+    digest = hashlib.sha256()
+    for entry in backend.timeline:
+        key = f"{entry[2]} {entry[3]}"
+        counts[key] = counts.get(key, 0) + 1
+        digest.update(repr(entry).encode("utf-8"))
+
+    if args.timeline:
+        with open(args.timeline, "w") as file:
+            file.writelines(json.dumps(dict(zip(("t", "account", "endpoint", "status"), entry))) + "\n" for entry in backend.timeline)
+
+    print(f"Simulated {args.hours:g}h for {args.accounts} accounts in {elapsed:.1f}s wall time")
+    for key in sorted(counts):
+        print(f"  {key:<24} {counts[key]}")
+    print(f"Timeline digest: {digest.hexdigest()}")
+
+if __name__ == "__main__":
+    main()
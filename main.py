@@ -1,18 +1,54 @@
+import argparse
 import asyncio
-from utils.core import process
+import os
 
 
-async def main():
+def parse_args():
+    parser = argparse.ArgumentParser(description="NodepayBot - Ping Utility")
+    parser.add_argument("--proxies", action=argparse.BooleanOptionalAction, help="Use proxies from the proxies file, or not, without asking (default: USE_PROXIES, else prompt)")
+    parser.add_argument("--tokens-file", help="File the tokens are read from (default: TOKENS_FILE or tokens.txt)")
+    parser.add_argument("--proxies-file", help="File the proxies are read from (default: PROXIES_FILE or proxies.txt)")
+    parser.add_argument("--workers", type=int, default=1, help="Number of processes to split the accounts across (default: 1)")
+    parser.add_argument("--profile", type=int, metavar="ROUNDS", help="Profile ROUNDS ping rounds against a local mock server and exit")
+    parser.add_argument("--profile-accounts", type=int, default=1000, help="Synthetic accounts used by --profile (default: 1000)")
+    parser.add_argument("--profile-interval", type=int, default=10, help="Seconds per profiled ping round (default: 10)")
+    parser.add_argument("--profile-output", default="profile-report.txt", help="Report file written by --profile (default: profile-report.txt)")
+    return parser.parse_args()
+
+
+async def main(use_proxies=None):
+    from utils.core import process, shutdown
+
     try:
-        await process()
+        await process(use_proxies)
     except KeyboardInterrupt:
         print("Program interrupted. Exiting gracefully...")
     finally:
         print("Cleaning up resources before exiting.")
+        await shutdown()
 
 
 if __name__ == '__main__':
-    try:
-        asyncio.run(main())
-    except (KeyboardInterrupt, SystemExit):
-        pass
+    args = parse_args()
+
+    # Settings are read from the environment on import, so file paths given on the command line go there first
+    if args.tokens_file:
+        os.environ["TOKENS_FILE"] = args.tokens_file
+    if args.proxies_file:
+        os.environ["PROXIES_FILE"] = args.proxies_file
+
+    # The bot is imported lazily: profiling has to point the settings at the mock server first,
+    # and the heavy HTTP modules are only loaded once a run actually starts
+    if args.profile:
+        from benchmarks.profiler import run_profile
+        run_profile(args.profile, args.profile_accounts, args.profile_output, args.profile_interval)
+    elif args.workers > 1:
+        from utils.core import run_supervisor
+        run_supervisor(args.workers, args.proxies)
+    else:
+        from utils.services.runtime import install_event_loop
+        install_event_loop()
+        try:
+            asyncio.run(main(args.proxies))
+        except (KeyboardInterrupt, SystemExit):
+            pass
@@ -0,0 +1,56 @@
+import asyncio
+
+from utils.services import clock
+from utils.services.rate_limiter import HostRateLimiter
+
+
+# Fire `waiters` requests through one limiter on virtual time, sending a 429 with `retry_after` at `limited_at`.
+# Returns the virtual time each request was let through and the time the 429 arrived.
+def run_fleet(waiters, rate, burst, retry_after, limited_at=1.0):
+    fired = []
+
+    async def fleet():
+        limiter = HostRateLimiter("api.example", rate=rate, burst=burst)
+
+        async def request():
+            await limiter.acquire()
+            fired.append(clock.monotonic())
+
+        async def rate_limited():
+            await asyncio.sleep(limited_at)
+            limiter.on_rate_limited(retry_after)
+            return clock.monotonic()
+
+        tasks = [asyncio.create_task(request()) for _ in range(waiters)]
+        limited = await rate_limited()
+        await asyncio.gather(*tasks)
+        return limited
+
+    return fired, clock.run_virtual(fleet())
+
+def test_pause_releases_at_most_a_burst():
+    fired, limited = run_fleet(waiters=3000, rate=100, burst=100, retry_after=30)
+    resumed = limited + 30
+
+    assert not [at for at in fired if limited < at < resumed - 1e-3]
+    # Half the rate after the 429: a full bucket at the end of the pause, then 50 requests a second
+    assert len([at for at in fired if resumed - 1e-3 <= at < resumed + 0.1]) <= 100 + 50 * 0.1 + 1
+
+def test_requests_after_the_pause_keep_the_halved_rate():
+    fired, limited = run_fleet(waiters=3000, rate=100, burst=100, retry_after=30)
+    resumed = limited + 30
+
+    after = sorted(at for at in fired if at >= resumed - 1e-3)
+    steady = after[100:]
+    assert steady
+    # Each one-second window past the initial burst holds at most 50 requests
+    for start in range(int(steady[-1] - resumed)):
+        window = [at for at in steady if resumed + start <= at < resumed + start + 1]
+        assert len(window) <= 51
+
+def test_short_pause_only_earns_what_it_lasted():
+    fired, limited = run_fleet(waiters=1000, rate=100, burst=100, retry_after=0.5)
+    resumed = limited + 0.5
+
+    # 0.5s at the halved rate earns 25 tokens, so no more than that go out together at the end of the pause
+    assert len([at for at in fired if resumed - 1e-3 <= at < resumed + 0.01]) <= 25 + 1
@@ -1 +1,2 @@
-from .account import process
\ No newline at end of file
+from .account import process, shutdown
+from .supervisor import run_supervisor
\ No newline at end of file
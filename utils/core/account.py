@@ -1,67 +1,105 @@
 import asyncio
-import time
-
-from utils.network import get_profile_info, ping_all_accounts
-from utils.services import get_proxy_choice, assign_proxies
-from utils.services import processed_tokens, load_tokens, send_request
-from utils.settings import ACTIVATE_ACCOUNTS, DAILY_CLAIM, logger, Fore
+import zlib
+
+from utils.network import get_profile_info, ping_all_accounts, schedule_accounts, start_reward_scheduler, stop_claim_scheduler
+from utils.services import clock, get_proxy_choice, load_proxies, assign_proxies
+from utils.services import processed_tokens, load_tokens, send_request, get_worker_pool
+from utils.services import start_token_watcher, stop_token_watcher, is_available, load_quarantined
+from utils.services import restore_accounts, start_state_writer, close_state_store, close_worker_pool, close_sessions
+from utils.services import add_round_listener, log_round_summary, start_metrics_server, stop_metrics_server
+from utils.services import start_watchdog, stop_watchdog
+from utils.settings import ACTIVATE_ACCOUNTS, DAILY_CLAIM, DEBUG, logger, Fore
 from utils.settings import DOMAIN_API, CONNECTION_STATES, setup_logging, startup_art
 
 
+# Ping statistics of a single browser session
+class BrowserSession:
+    __slots__ = ("ping_count", "successful_pings", "score", "start_time", "last_ping_time")
+
+    def __init__(self):
+        self.ping_count = 0
+        self.successful_pings = 0
+        self.score = 0
+        self.start_time = clock.now()
+        self.last_ping_time = None
+
+    # Payload representation sent as browser_id in ping requests
+    def as_dict(self):
+        return {
+            'ping_count': self.ping_count,
+            'successful_pings': self.successful_pings,
+            'score': self.score,
+            'start_time': self.start_time,
+            'last_ping_time': self.last_ping_time
+        }
+
 # Account class to hold token, proxy, and other details for each account
 class AccountData:
+    __slots__ = (
+        "token", "index", "proxy", "status_connect", "points_per_proxy", "account_info",
+        "claimed_rewards", "retries", "last_ping_status", "browser_ids", "account_info_updated",
+        "response_cache", "retired", "cooldown_until", "authorization"
+    )
+
     def __init__(self, token, index, proxy=None):
         self.token = token
+        self.authorization = f"Bearer {token}"
         self.index = index
         self.proxy = proxy
 
-        # Set the initial connection status to 'None' (no connection)
+        # Set the initial connection status to 'None' (no connection); utils/services/health.py drives it from here,
+        # with retries counting consecutive failures and cooldown_until pausing the account after too many
         self.status_connect = CONNECTION_STATES["NONE_CONNECTION"]
         self.points_per_proxy = {}
         self.account_info = {}
+        self.account_info_updated = None
         self.claimed_rewards = set()
         self.retries = 0
+        self.cooldown_until = None
         self.last_ping_status = 'Waiting...'
 
+        # Cached responses per endpoint as (expires_at, response)
+        self.response_cache = {}
+
         # Initialize a list to hold browser session details (such as ping counts and scores)
-        self.browser_ids = [
-            {
-                'ping_count': 0,
-                'successful_pings': 0,
-                'score': 0,
-                'start_time': time.time(),
-                'last_ping_time': None
-            }
-        ]
+        self.browser_ids = [BrowserSession()]
+
+        # Set once the token is removed from the tokens file; schedulers drop retired accounts
+        self.retired = False
 
     # Reset account state for retries or disconnection
     def reset(self):
         self.status_connect = CONNECTION_STATES["NONE_CONNECTION"]
         self.account_info = {}
-        self.retries = 3
+        self.retries = 0
+        self.cooldown_until = None
         logger.info(f"{Fore.CYAN}00{Fore.RESET} - {Fore.GREEN}Resetting account {self.index}{Fore.RESET}")
 
-# Activate accounts and update their status
-async def activate_accounts(accounts) -> None:
-    if isinstance(accounts, AccountData):
-        accounts = [accounts]
+# Activate a single account and update its status
+async def activate_account(account) -> None:
+    try:
+        response = await send_request(DOMAIN_API["ACTIVATE"], {}, account, method="POST")
+    except Exception as e:
+        logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Error activating account {account.index}: {e}{Fore.RESET}")
+        account.status_connect = CONNECTION_STATES["NONE_CONNECTION"]
+        return
 
-    tasks = [send_request(DOMAIN_API["ACTIVATE"], {}, account, method="POST") for account in accounts]
-    responses = await asyncio.gather(*tasks, return_exceptions=True)
+    if response and response.get("code") == 5 and "already activated" in response.get("msg", "").lower():
+        account.status_connect = CONNECTION_STATES["CONNECTED"]
+        if DEBUG:
+            logger.debug(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.GREEN}Account {account.index} is already activated.{Fore.RESET}")
 
-    for account, response in zip(accounts, responses):
-        if isinstance(response, Exception):
-            logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Error activating account {account.index}: {response}{Fore.RESET}")
-            account.status_connect = CONNECTION_STATES["NONE_CONNECTION"]
-            continue
+    elif response and response.get("success") and response.get("data") is True:
+        account.status_connect = CONNECTION_STATES["CONNECTED"]
+        logger.info(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.GREEN}Account {account.index} activated successfully.{Fore.RESET}")
 
-        if response and response.get("code") == 5 and "already activated" in response.get("msg", "").lower():
-            account.status_connect = CONNECTION_STATES["CONNECTED"]
-            logger.debug(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.GREEN}Account {account.index} is already activated.{Fore.RESET}")
+# Activate accounts through the worker pool and update their status; accounts restored as activated are skipped
+async def activate_accounts(accounts) -> None:
+    if isinstance(accounts, AccountData):
+        accounts = [accounts]
 
-        elif response and response.get("success") and response.get("data") is True:
-            account.status_connect = CONNECTION_STATES["CONNECTED"]
-            logger.info(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.GREEN}Account {account.index} activated successfully.{Fore.RESET}")
+    pending = [account for account in accounts if account.status_connect != CONNECTION_STATES["CONNECTED"]]
+    await get_worker_pool().map(activate_account, pending)
 
 # Synchronize account data by fetching profile and earning information
 async def process_account(account):
@@ -70,35 +108,129 @@ async def process_account(account):
     except Exception as e:
         logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Error processing account {account.index}: {e}{Fore.RESET}")
 
-# Main function to manage the application flow
-async def process():
-    startup_art()
+# Shard that owns a token; a stable hash rather than the line position keeps the split the same
+# when the file is edited or a shard is restarted by the supervisor
+def token_shard(token, shards):
+    return zlib.crc32(token.encode("utf-8")) % shards
+
+# Applies tokens file changes to this process's running accounts, leaving unchanged accounts untouched
+class AccountReloader:
+    def __init__(self, accounts, proxies, next_index, shard=0, shards=1):
+        self.accounts = accounts
+        self.proxies = proxies
+        self.next_index = next_index
+        self.shard = shard
+        self.shards = shards
+
+    async def __call__(self, added, removed):
+        removed = set(removed)
+        retired = [account for account in self.accounts if account.token in removed]
+        for account in retired:
+            account.retired = True
+            processed_tokens.discard(account.token)
+        if retired:
+            self.accounts[:] = [account for account in self.accounts if not account.retired]
+
+        quarantined = load_quarantined()
+        added = [token for token in added if token not in quarantined and token_shard(token, self.shards) == self.shard]
+
+        # New accounts take proxies no running account uses, then run without one
+        used = {account.proxy for account in self.accounts}
+        free_proxies = iter([proxy for proxy in self.proxies if proxy not in used])
+        new_accounts = []
+        for token in added:
+            new_accounts.append(AccountData(token, self.next_index, next(free_proxies, None)))
+            self.next_index += 1
+
+        if new_accounts:
+            restore_accounts(new_accounts)
+            if ACTIVATE_ACCOUNTS:
+                await activate_accounts(new_accounts)
+            if DAILY_CLAIM:
+                await get_worker_pool().map(process_account, [account for account in new_accounts if not account.account_info.get("uid")])
+
+            self.accounts.extend(new_accounts)
+            schedule_accounts(new_accounts)
+
+        if new_accounts or retired:
+            logger.info(f"{Fore.CYAN}00{Fore.RESET} - {Fore.GREEN}Tokens reloaded: {len(new_accounts)} added, {len(retired)} retired, {len(self.accounts)} running{Fore.RESET}")
+
+# Main function to manage the application flow; shard/shards select this process's slice of the accounts
+async def process(use_proxies=None, shard=0, shards=1):
     setup_logging()
 
-    proxies = get_proxy_choice()
+    # Each input file is read once; the startup art only shows the counts
     tokens = await load_tokens()
+    proxies = load_proxies()
+    if shards == 1:
+        startup_art(len(tokens), len(proxies))
+
+    proxies = get_proxy_choice(use_proxies, proxies)
 
     logger.info(f"{Fore.CYAN}00{Fore.RESET} - {Fore.GREEN}Proceeding with{'out proxies...' if not proxies else ' proxies...'}{Fore.RESET}")
 
+    # Tokens the API rejected in an earlier run stay out until they are removed from the quarantine file
+    quarantined = load_quarantined()
+    if quarantined:
+        active_tokens = [token for token in tokens if token not in quarantined]
+        if len(active_tokens) < len(tokens):
+            logger.warning(f"{Fore.CYAN}00{Fore.RESET} - {Fore.YELLOW}Skipping {len(tokens) - len(active_tokens)} quarantined tokens{Fore.RESET}")
+        tokens = active_tokens
+
     token_proxy_pairs = assign_proxies(tokens, proxies)
-    accounts = [AccountData(token, index, proxy) for index, (token, proxy) in enumerate(token_proxy_pairs, start=1)]
+    accounts = [
+        AccountData(token, index, proxy)
+        for index, (token, proxy) in enumerate(token_proxy_pairs, start=1)
+        if shards == 1 or token_shard(token, shards) == shard
+    ]
+
+    if shards > 1:
+        logger.info(f"{Fore.CYAN}00{Fore.RESET} - Shard {shard + 1}/{shards} handling {len(accounts)} accounts")
+    else:
+        # With several shards the supervisor logs the merged digest instead
+        add_round_listener(log_round_summary)
+
+    # Warm restart: accounts with a saved session can ping right away
+    restored = restore_accounts(accounts)
+    if restored:
+        logger.info(f"{Fore.CYAN}00{Fore.RESET} - {Fore.GREEN}Restored saved state for {restored} accounts{Fore.RESET}")
+    start_state_writer()
+    await start_metrics_server(shard)
+    start_watchdog()
+
+    if DAILY_CLAIM:
+        start_reward_scheduler()
 
     if ACTIVATE_ACCOUNTS:
         await activate_accounts(accounts)
 
+    start_token_watcher(tokens, AccountReloader(accounts, proxies, len(token_proxy_pairs) + 1, shard, shards))
+    # The watcher keeps its own set of the tokens, so the loaded lists can go
+    del tokens, token_proxy_pairs
+
+    first_cycle = True
     while True:
         try:
             if DAILY_CLAIM:
                 processed_tokens.clear()
                 logger.info(f"{Fore.CYAN}00{Fore.RESET} - Loading account details, checking rewards, and claiming. Please wait...")
-                await asyncio.sleep(3)
+                # The pauses between phases only pace later cycles; the first one goes straight to work
+                if not first_cycle:
+                    await asyncio.sleep(3)
 
-                # Collect tasks related to accounts: syncing profiles and fetching total points
-                tasks = [process_account(account) for account in accounts]
-                await asyncio.gather(*tasks, return_exceptions=True)
+                # Restored sessions are refreshed on the next cycle instead of delaying the first pings
+                pending = [
+                    account for account in accounts
+                    if is_available(account) and not (first_cycle and account.account_info.get("uid"))
+                ]
+
+                # Sync profiles and fetch total points through the bounded worker pool
+                await get_worker_pool().map(process_account, pending)
 
             logger.info(f"{Fore.CYAN}00{Fore.RESET} - Preparing to send ping, please wait...")
-            await asyncio.sleep(3)
+            if not first_cycle:
+                await asyncio.sleep(3)
+            first_cycle = False
 
             # Ping all accounts to keep their sessions active
             await ping_all_accounts(accounts)
@@ -108,3 +240,13 @@ async def process():
             break
         except Exception as e:
             logger.error(f"Unexpected error in the main loop: {e}")
+
+# Release background writers and pooled resources
+async def shutdown():
+    await stop_token_watcher()
+    await stop_claim_scheduler()
+    await stop_metrics_server()
+    await stop_watchdog()
+    await close_worker_pool()
+    await close_state_store()
+    await close_sessions()
@@ -0,0 +1,88 @@
+import asyncio
+import multiprocessing
+import queue
+import time
+
+from utils.core.account import process, shutdown
+from utils.services import resolve_proxy_choice, add_round_listener, merge_stats, log_round_summary
+from utils.services.runtime import install_event_loop
+from utils.settings import PING_INTERVAL, logger, Fore, setup_logging, startup_art
+
+
+# Seconds to wait before restarting a shard that exited
+RESTART_DELAY = 5
+
+# Run one shard with its own event loop, worker pool and connection pool
+async def run_shard_loop(shard, shards, use_proxies):
+    try:
+        await process(use_proxies=use_proxies, shard=shard, shards=shards)
+    finally:
+        await shutdown()
+
+# Entry point of a shard process; forwards round statistics to the supervisor
+def run_shard(shard, shards, use_proxies, stats_queue):
+    add_round_listener(lambda stats: stats_queue.put((shard, stats)))
+    install_event_loop()
+    try:
+        asyncio.run(run_shard_loop(shard, shards, use_proxies))
+    except KeyboardInterrupt:
+        pass
+
+# Start the process for a shard
+def start_shard(context, shard, shards, use_proxies, stats_queue):
+    worker = context.Process(target=run_shard, args=(shard, shards, use_proxies, stats_queue), name=f"shard-{shard + 1}", daemon=True)
+    worker.start()
+    return worker
+
+# Partition the accounts across several processes, restarting crashed shards and merging their statistics
+def run_supervisor(workers, use_proxies=None):
+    startup_art()
+    setup_logging()
+
+    use_proxies = resolve_proxy_choice(use_proxies)
+
+    context = multiprocessing.get_context("spawn")
+    stats_queue = context.Queue()
+    shards = {shard: start_shard(context, shard, workers, use_proxies, stats_queue) for shard in range(workers)}
+    restart_at = {}
+
+    totals, reports = {}, 0
+    next_summary = time.monotonic() + PING_INTERVAL
+
+    try:
+        while True:
+            try:
+                _, stats = stats_queue.get(timeout=1)
+                merge_stats(totals, stats)
+                reports += 1
+            except queue.Empty:
+                pass
+
+            now = time.monotonic()
+            for shard, worker in shards.items():
+                if worker.is_alive():
+                    continue
+
+                if shard not in restart_at:
+                    logger.error(f"{Fore.CYAN}00{Fore.RESET} - {Fore.RED}Shard {shard + 1} exited with code {worker.exitcode}. Restarting in {RESTART_DELAY} seconds...{Fore.RESET}")
+                    restart_at[shard] = now + RESTART_DELAY
+
+                elif now >= restart_at[shard]:
+                    shards[shard] = start_shard(context, shard, workers, use_proxies, stats_queue)
+                    del restart_at[shard]
+
+            if now >= next_summary:
+                if reports:
+                    log_round_summary(totals, f"Round summary ({reports} reports from {workers} shards)")
+                totals, reports = {}, 0
+                next_summary = now + PING_INTERVAL
+
+    except KeyboardInterrupt:
+        print("Supervisor interrupted. Stopping shards...")
+
+    finally:
+        for worker in shards.values():
+            if worker.is_alive():
+                worker.terminate()
+        for worker in shards.values():
+            worker.join(timeout=10)
@@ -1,2 +1,3 @@
-from .ping_manager import ping_all_accounts
-from .reward_manager import get_profile_info
\ No newline at end of file
+from .ping_manager import ping_all_accounts, schedule_accounts
+from .reward_manager import get_profile_info, start_reward_scheduler
+from .claim_scheduler import stop_claim_scheduler
\ No newline at end of file
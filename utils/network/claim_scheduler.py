@@ -0,0 +1,102 @@
+import asyncio
+import heapq
+import itertools
+
+from utils.services import clock, get_worker_pool, is_quarantined
+from utils.settings import DEBUG, logger, Fore
+
+
+# Pending claims as (due_time, sequence, account, mission_id, reward_name, required_reward)
+claim_queue = []
+sequence = itertools.count()
+
+# Due time of the live entry per (account index, mission id); older heap entries are skipped
+scheduled_claims = {}
+
+# Claims whose due time has passed but whose required reward is not claimed yet, keyed by (account index, required reward)
+waiting_claims = {}
+
+claim_wakeup = None
+scheduler_task = None
+
+# Register a wake-up to claim a mission once its remain_time has elapsed
+def schedule_claim(account, mission_id, reward_name, delay, required=None):
+    key = (account.index, str(mission_id))
+    due = clock.now() + max(delay, 0)
+
+    # Keep the earlier wake-up when the same mission is reported again
+    if key in scheduled_claims and scheduled_claims[key] <= due:
+        return
+    scheduled_claims[key] = due
+
+    heapq.heappush(claim_queue, (due, next(sequence), account, str(mission_id), reward_name, required))
+    if claim_wakeup is not None:
+        claim_wakeup.set()
+
+# Release claims that were waiting for the given reward, e.g. 14 Day after 7 Day is claimed
+def release_dependents(account, claimed_reward):
+    for _, _, waiting_account, mission_id, reward_name, _ in waiting_claims.pop((account.index, claimed_reward), []):
+        scheduled_claims.pop((waiting_account.index, mission_id), None)
+        schedule_claim(waiting_account, mission_id, reward_name, 0)
+
+# Earliest wake-up registered for any of the account's missions, or None
+def next_claim_due(account, mission_ids):
+    dues = [scheduled_claims.get((account.index, str(mission_id))) for mission_id in mission_ids]
+    dues = [due for due in dues if due is not None]
+    return min(dues) if dues else None
+
+# Pop due claims and hand them to the worker pool, sleeping until the next due time otherwise
+async def run_claim_scheduler(handler):
+    pool = get_worker_pool()
+
+    while True:
+        if not claim_queue:
+            await claim_wakeup.wait()
+            claim_wakeup.clear()
+            continue
+
+        delay = claim_queue[0][0] - clock.now()
+        if delay > 0:
+            try:
+                await asyncio.wait_for(claim_wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            claim_wakeup.clear()
+            continue
+
+        entry = heapq.heappop(claim_queue)
+        due, _, account, mission_id, reward_name, required = entry
+
+        key = (account.index, mission_id)
+        if scheduled_claims.get(key) != due:
+            continue
+
+        if account.retired or is_quarantined(account):
+            del scheduled_claims[key]
+            continue
+
+        if required and required not in account.claimed_rewards:
+            waiting_claims.setdefault((account.index, required), []).append(entry)
+            if DEBUG:
+                logger.debug(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {reward_name} is waiting for {required} to be claimed")
+            continue
+
+        del scheduled_claims[key]
+        await pool.submit(handler, account, mission_id, reward_name)
+
+# Start the claim scheduler with the coroutine that performs a claim
+def start_claim_scheduler(handler):
+    global claim_wakeup, scheduler_task
+
+    if scheduler_task is None:
+        claim_wakeup = asyncio.Event()
+        scheduler_task = asyncio.create_task(run_claim_scheduler(handler))
+
+# Stop the claim scheduler
+async def stop_claim_scheduler():
+    global scheduler_task
+
+    if scheduler_task is not None:
+        scheduler_task.cancel()
+        await asyncio.gather(scheduler_task, return_exceptions=True)
+        scheduler_task = None
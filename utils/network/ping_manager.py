@@ -1,13 +1,21 @@
 import asyncio
-import time
+import heapq
 
 from colorama import Style
 from urllib.parse import urlparse
 
-from utils.services import retry_request, mask_token, resolve_ip
-from utils.settings import DOMAIN_API, PING_DURATION, PING_INTERVAL, logger, Fore
+from utils.services import clock, retry_request, mask_token, resolve_ip, get_worker_pool
+from utils.services import record_ping, publish_round, mark_dirty, is_available, is_quarantined
+from utils.services.worker_pool import JobBatch
+from utils.services.latency_tracker import get_hedge_delay
+from utils.services.metrics import pings_total, scheduler_lag, round_duration, queue_depth
+from utils.settings import DOMAIN_API, PING_DURATION, PING_INTERVAL, PING_HEDGE, DEBUG, logger, Fore
 
 
+# Built once: the separator and the URL paths only feed log lines
+SEPARATOR_LINE = f"{Fore.CYAN + Style.BRIGHT}-" * 75 + f"{Style.RESET_ALL}"
+PING_PATHS = {url: urlparse(url).path for url in DOMAIN_API["PING"]}
+
 # Send periodic pings to the server for the given account
 async def process_ping_response(response, url, account, data):
     if not response or not isinstance(response, dict):
@@ -19,12 +27,14 @@ async def process_ping_response(response, url, account, data):
         logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Invalid 'data' field in response:{Fore.RESET} {response_data}")
         return "failed", None
 
-    logger.debug(
-        f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - Response {{"
-        f"Success: {response.get('success')}, Code: {response.get('code')}, "
-        f"IP Score: {response.get('data', {}).get('ip_score', 'N/A')}, "
-        f"Message: {response.get('msg', 'No message')}}}"
-    )
+    # Debug lines are only formatted when DEBUG is on
+    if DEBUG:
+        logger.debug(
+            f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - Response {{"
+            f"Success: {response.get('success')}, Code: {response.get('code')}, "
+            f"IP Score: {response.get('data', {}).get('ip_score', 'N/A')}, "
+            f"Message: {response.get('msg', 'No message')}}}"
+        )
 
     try:
         version = response_data.get("version", "2.2.7")
@@ -34,24 +44,22 @@ async def process_ping_response(response, url, account, data):
         network_quality = response_data.get("ip_score", "N/A")
 
         account_stats = account.browser_ids[0]
-        account_stats.setdefault("ping_count", 0)
-        account_stats.setdefault("score", 0)
-        account_stats.setdefault("successful_pings", 0)
 
-        account_stats['ping_count'] += 1
+        account_stats.ping_count += 1
         if ping_result == "success":
-            account_stats['score'] += 10
-            account_stats["successful_pings"] += 1
+            account_stats.score += 10
+            account_stats.successful_pings += 1
         else:
-            account_stats['score'] -= 5
-
-        logger.debug(
-            f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - "
-            f"Browser Stats {{Ping Count: {account.browser_ids[0]['ping_count']}, "
-            f"Success: {account.browser_ids[0]['successful_pings']}, "
-            f"Score: {account.browser_ids[0]['score']}, "
-            f"Last Ping: {account.browser_ids[0]['last_ping_time']:.2f}}}"
-        )
+            account_stats.score -= 5
+
+        if DEBUG:
+            logger.debug(
+                f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - "
+                f"Browser Stats {{Ping Count: {account_stats.ping_count}, "
+                f"Success: {account_stats.successful_pings}, "
+                f"Score: {account_stats.score}, "
+                f"Last Ping: {account_stats.last_ping_time:.2f}}}"
+            )
 
         return ping_result, network_quality
 
@@ -61,91 +69,219 @@ async def process_ping_response(response, url, account, data):
         return "failed", None
 
 # Function to start the ping process for each account
-async def start_ping(account):
-    current_time = time.time()
-
-    separator_line = f"{Fore.CYAN + Style.BRIGHT}-" * 75 + f"{Style.RESET_ALL}"
-
-    if account.index == 1:
-        logger.debug(separator_line)
-
-    # Validate browser_ids
-    if not account.browser_ids or not isinstance(account.browser_ids[0], dict):
-        logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Invalid or missing browser_ids structure.{Fore.RESET}")
-        return
+async def start_ping(account, current_time=None):
+    # The scheduler passes the deadline the ping was due at, so consecutive pings are exactly PING_INTERVAL apart
+    current_time = current_time or clock.now()
 
-    account.browser_ids[0].setdefault('ping_count', 0)
-    account.browser_ids[0].setdefault('score', 0)
+    browser_session = account.browser_ids[0]
+    last_ping_time = browser_session.last_ping_time
 
-    last_ping_time = account.browser_ids[0].get('last_ping_time', 0)
-    logger.debug(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - Current time: {current_time}, Last ping time: {last_ping_time}")
+    if DEBUG:
+        if account.index == 1:
+            logger.debug(SEPARATOR_LINE)
+        logger.debug(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - Current time: {current_time}, Last ping time: {last_ping_time}")
 
     if last_ping_time and (current_time - last_ping_time) < PING_INTERVAL:
         logger.warning(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.YELLOW}Hold on! Please wait a bit longer before trying again.{Fore.RESET}")
         return
 
-    account.browser_ids[0]['last_ping_time'] = current_time
+    browser_session.last_ping_time = current_time
+    mark_dirty(account)
 
     # Start ping loop
-    for url in DOMAIN_API.get("PING", []):
-        try:
-            parsed_url = urlparse(url)
-            path = parsed_url.path
-            logger.debug(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - Sending ping to {path}")
-            data = {
-                "id": account.account_info.get("uid"),
-                "browser_id": account.browser_ids[0],
-                "timestamp": int(time.time()),
-            }
-
-            # Send request with retry handling
-            response = await retry_request(url, data, account)
-
-            if response is None:
-                logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}No response from {path}{Fore.RESET}")
-                continue
-        
-            ping_result, network_quality = await process_ping_response(response, url, account, data)
-
-            logger.debug(separator_line)
-
-            identifier = await resolve_ip(account)
-            logger.info(
-                f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.GREEN}Ping{Fore.RESET} {Fore.GREEN}{ping_result}{Fore.RESET}, "
-                f"Token: {Fore.CYAN}{mask_token(account.token)}{Fore.RESET}, "
-                f"IP Score: {Fore.CYAN}{network_quality}{Fore.RESET}, "
-                f"{'Proxy' if account.proxy else 'IP Address'}: {Fore.CYAN}{identifier}{Fore.RESET}"
-            )
-
-            if ping_result == "success":
+    ping_result = "failed"
+    ping_started = clock.monotonic()
+    ping_urls = DOMAIN_API.get("PING", [])
+
+    if PING_HEDGE and len(ping_urls) > 1:
+        ping_result = await send_hedged_ping(account, browser_session, ping_urls)
+    else:
+        for url in ping_urls:
+            # Quarantined or paused by a failure on the previous URL
+            if not is_available(account):
                 break
+            try:
+                path = PING_PATHS.get(url) or urlparse(url).path
+                if DEBUG:
+                    logger.debug(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - Sending ping to {path}")
+                data = build_ping_payload(account, browser_session)
+
+                # Send request with retry handling
+                response = await retry_request(url, data, account)
+
+                if response is None:
+                    logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}No response from {path}{Fore.RESET}")
+                    continue
+
+                ping_result = await report_ping(response, url, account, data)
+                if ping_result == "success":
+                    break
+
+            except KeyError as ke:
+                logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}KeyError during ping:{Fore.RESET} {ke}")
+
+            except Exception as e:
+                short_error = str(e).split(" See")[0]
+                logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Unexpected error while pinging:{Fore.RESET} {short_error}")
+                await asyncio.sleep(1)
+
+    record_ping(ping_result, clock.monotonic() - ping_started)
+    pings_total.inc(ping_result)
+
+# Payload of a ping request
+def build_ping_payload(account, browser_session):
+    return {
+        "id": account.account_info.get("uid"),
+        "browser_id": browser_session.as_dict(),
+        "timestamp": int(clock.now()),
+    }
+
+# Process a ping response and log its outcome; returns the ping result
+async def report_ping(response, url, account, data):
+    ping_result, network_quality = await process_ping_response(response, url, account, data)
+
+    if DEBUG:
+        logger.debug(SEPARATOR_LINE)
+
+    identifier = await resolve_ip(account)
+    logger.info(
+        f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.GREEN}Ping{Fore.RESET} {Fore.GREEN}{ping_result}{Fore.RESET}, "
+        f"Token: {Fore.CYAN}{mask_token(account.token)}{Fore.RESET}, "
+        f"IP Score: {Fore.CYAN}{network_quality}{Fore.RESET}, "
+        f"{'Proxy' if account.proxy else 'IP Address'}: {Fore.CYAN}{identifier}{Fore.RESET}"
+    )
+    return ping_result
 
-        except KeyError as ke:
-            logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}KeyError during ping:{Fore.RESET} {ke}")
+# Ping the first URL and add the next one whenever the previous has not answered by its p95 or has failed;
+# the first response wins and the requests still running are cancelled
+async def send_hedged_ping(account, browser_session, ping_urls):
+    data = build_ping_payload(account, browser_session)
+    urls_by_task = {}
+    pending = set()
 
-        except Exception as e:
-            short_error = str(e).split(" See")[0]
-            logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Unexpected error while pinging:{Fore.RESET} {short_error}")
-            await asyncio.sleep(1)
+    try:
+        for position, url in enumerate(ping_urls):
+            task = asyncio.create_task(retry_request(url, data, account))
+            urls_by_task[task] = url
+            pending.add(task)
+            is_last = position == len(ping_urls) - 1
+
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=None if is_last else get_hedge_delay(url), return_when=asyncio.FIRST_COMPLETED)
+
+                for finished in done:
+                    error = finished.exception()
+                    if error is None and finished.result() is not None:
+                        return await report_ping(finished.result(), urls_by_task[finished], account, data)
+                    if error is not None:
+                        short_error = str(error).split(" See")[0]
+                        logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Ping to {PING_PATHS.get(urls_by_task[finished])} failed:{Fore.RESET} {short_error}")
+
+                # Not answered in time, or failed: bring in the next URL
+                if not is_last:
+                    break
+
+        logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}No response from any ping endpoint{Fore.RESET}")
+        return "failed"
+
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+# Accounts added while a ping cycle is running, merged into its schedule by the scheduler
+added_accounts = []
+accounts_added = None
+
+# Have the running ping cycle pick up new accounts; later cycles get them from the accounts list
+def schedule_accounts(accounts):
+    added_accounts.extend(accounts)
+    if accounts_added is not None:
+        accounts_added.set()
+
+# Ping one account and report failures without affecting the other accounts
+async def run_scheduled_ping(account, deadline, in_flight):
+    try:
+        await start_ping(account, deadline)
+    except Exception as e:
+        logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Error pinging account:{Fore.RESET} {e}")
+    finally:
+        in_flight.discard(account.index)
 
-# Ping all accounts periodically
+# Ping every account on its own deadline, spreading start times evenly across PING_INTERVAL
 async def ping_all_accounts(accounts):
-    start_time = time.time()
-
-    while time.time() - start_time < PING_DURATION:
-        try:
-            # Ping all accounts concurrently
-            tasks = [start_ping(account) for account in accounts]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-
-            # Log errors for failed accounts
-            for account, result in zip(accounts, results):
-                if isinstance(result, Exception):
-                    logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Error pinging account:{Fore.RESET} {result}")
-
-        except Exception as e:
-            short_error = str(e).split(" See")[0]
-            logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Unexpected error in ping_all_accounts:{Fore.RESET} {short_error}")
-
-        logger.info(f"{Fore.CYAN}00{Fore.RESET} - Sleeping for {PING_INTERVAL} seconds before the next round")
-        await asyncio.sleep(PING_INTERVAL)
+    global accounts_added
+
+    start_time = clock.now()
+    end_time = start_time + PING_DURATION
+    spacing = PING_INTERVAL / max(len(accounts), 1)
+    added_accounts.clear()
+    accounts_added = asyncio.Event()
+
+    # Heap of (deadline, index, account); accounts pinged recently keep their previous cadence
+    schedule = []
+    for position, account in enumerate(accounts):
+        deadline = start_time + position * spacing
+        last_ping_time = account.browser_ids[0].last_ping_time
+        if last_ping_time:
+            deadline = max(deadline, last_ping_time + PING_INTERVAL)
+        schedule.append((deadline, account.index, account))
+    heapq.heapify(schedule)
+
+    logger.info(f"{Fore.CYAN}00{Fore.RESET} - Scheduling pings for {len(accounts)} accounts every {PING_INTERVAL} seconds")
+    pool = get_worker_pool()
+    batch = JobBatch()
+    in_flight = set()
+    next_report = start_time + PING_INTERVAL
+
+    while True:
+        while added_accounts:
+            account = added_accounts.pop()
+            heapq.heappush(schedule, (clock.now(), account.index, account))
+
+        # Nothing to ping (every token quarantined, an empty tokens file or shard): sit out the cycle unless accounts arrive
+        if not schedule:
+            remaining = end_time - clock.now()
+            if remaining <= 0:
+                break
+            accounts_added.clear()
+            try:
+                await asyncio.wait_for(accounts_added.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+            continue
+
+        if schedule[0][0] >= end_time:
+            break
+
+        deadline, index, account = heapq.heappop(schedule)
+
+        # Accounts removed from the tokens file or quarantined leave the schedule for good
+        if account.retired or is_quarantined(account):
+            continue
+
+        delay = deadline - clock.now()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        scheduler_lag.observe(value=max(clock.now() - deadline, 0.0))
+
+        # A slow account, or one cooling down after repeated failures, only skips its own slot; it never holds back the others
+        if index in in_flight:
+            logger.warning(f"{Fore.CYAN}{index:02d}{Fore.RESET} - {Fore.YELLOW}Previous ping still running, skipping this interval.{Fore.RESET}")
+        elif is_available(account):
+            # Waits for room in the bounded queue, which throttles the schedule instead of piling up sockets
+            in_flight.add(index)
+            await pool.submit(run_scheduled_ping, account, deadline, in_flight, batch=batch)
+            queue_depth.set(value=pool.queue.qsize())
+
+        heapq.heappush(schedule, (deadline + PING_INTERVAL, index, account))
+
+        if deadline >= next_report:
+            pool.report("Ping scheduler")
+            publish_round()
+            next_report = deadline + PING_INTERVAL
+
+    # Let pings that are still running finish before the next cycle starts
+    await batch.wait()
+    publish_round()
+    round_duration.observe(value=clock.now() - start_time)
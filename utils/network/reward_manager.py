@@ -1,10 +1,15 @@
 from colorama import Style
 from datetime import timedelta
 
-from utils.settings import DOMAIN_API, logger, Fore
-from utils.services import retry_request, mark_token, mask_token
+from utils.settings import DOMAIN_API, DEBUG, logger, Fore
+from utils.services import clock, mark_token, mask_token, mark_dirty, record_points
+from utils.services import cached_request, extend_cache, invalidate_cache, retry_request
+from utils.network.claim_scheduler import schedule_claim, release_dependents, next_claim_due, start_claim_scheduler
 
 
+# Log separator for better readability
+SEPARATOR_LINE = f"{Fore.CYAN + Style.BRIGHT}-" * 75 + f"{Style.RESET_ALL}"
+
 # Function to display account information
 def display_account_info(account, data):
     logger.info(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.LIGHTMAGENTA_EX}Account Info for {data['name']}{Style.RESET_ALL}")
@@ -37,33 +42,35 @@ async def get_profile_info(account):
     try:
         # Check if the token is already processed
         if not await mark_token(account):
-            logger.debug(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.YELLOW}Token already processed. Skipping...{Fore.RESET}")
+            if DEBUG:
+                logger.debug(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.YELLOW}Token already processed. Skipping...{Fore.RESET}")
             return
 
-        # Log separator for better readability
-        separator_line = f"{Fore.CYAN + Style.BRIGHT}-" * 75 + f"{Style.RESET_ALL}"
-
         if account.index == 1:
-            logger.info(separator_line)
+            logger.info(SEPARATOR_LINE)
 
         # Fetch account profile details
         logger.info(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - Fetching profile details with token: {Fore.CYAN}{mask_token(account.token)}{Fore.RESET}")
-        response = await retry_request(DOMAIN_API["SESSION"], {}, account)
+        response = await cached_request("SESSION", {}, account)
 
         if response.get("success"):
             logger.info(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - Profile details fetched {Fore.GREEN}successfully{Fore.RESET}")
-            account.account_info = response["data"]
+            # A cached response hands back the same data object, so only fresh fetches are persisted
+            if response["data"] is not account.account_info:
+                account.account_info = response["data"]
+                account.account_info_updated = clock.now()
+                mark_dirty(account)
             data = account.account_info
 
             # Display account info
-            logger.info(separator_line)
+            logger.info(SEPARATOR_LINE)
             display_account_info(account, data)
 
             if account.account_info.get("uid"):
                 await get_earning_info(account)
                 await process_and_claim_rewards(account)
 
-            logger.info(separator_line)
+            logger.info(SEPARATOR_LINE)
 
         else:
             logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Session failed for token{Fore.RESET} "
@@ -77,7 +84,7 @@ async def get_profile_info(account):
 # Fetch and display the earning information of an account
 async def get_earning_info(account):
     try:
-        response = await retry_request(DOMAIN_API["EARN_INFO"], {}, account, method="GET")
+        response = await cached_request("EARN_INFO", {}, account, method="GET")
 
         if not response.get('success'):
             logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Unable to fetch earning info. Response:{Fore.RESET} {response}")
@@ -97,7 +104,7 @@ async def get_earning_info(account):
 # Handle checking and claiming rewards for an account
 async def process_and_claim_rewards(account):
     try:
-        response = await retry_request(DOMAIN_API["MISSION"], {}, account, method="GET")
+        response = await cached_request("MISSION", {}, account, method="GET")
 
         if not response.get('success'):
             logger.info(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Failed to fetch mission data:{Fore.RESET} {response}")
@@ -113,18 +120,28 @@ async def process_and_claim_rewards(account):
 
         # Get the reward mapping from the new function
         reward_mapping = get_reward_mapping()
+        needs_polling = False
 
         for item in data:
             reward_info = reward_mapping.get(str(item['id']))
             if reward_info:
-                if reward_info["required"] and reward_info["required"] not in account.claimed_rewards:
+                if reward_info["required"] and reward_info["required"] not in account.claimed_rewards and item.get('status') != "COMPLETED":
+                    # Park it behind its requirement; claiming the requirement releases it
+                    remain_time = int(item.get('remain_time', 0) or 0) / 1000
+                    schedule_claim(account, item['id'], reward_info["name"], remain_time, reward_info["required"])
                     continue
-                await claim_reward(account, item, reward_info["name"], reward_info["required"], reward_info["is_progress_based"])
+                if not await claim_reward(account, item, reward_info["name"], reward_info["required"], reward_info["is_progress_based"]):
+                    needs_polling = True
+
+        # Every open mission has a wake-up registered, so skip MISSION polling until the earliest one
+        next_due = next_claim_due(account, [item['id'] for item in data])
+        if not needs_polling and next_due:
+            extend_cache(account, "MISSION", next_due)
 
     except Exception as e:
         logger.info(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Error checking rewards:{Fore.RESET} {e}")
 
-# Handle the process of claiming daily rewards for an account
+# Handle the process of claiming daily rewards for an account; returns False while the mission still needs polling
 async def claim_reward(account, reward_data, reward_name, required_claim=None, is_progress_based=False):
     current_process = reward_data.get('current_process', 0)
     target_process = reward_data.get('target_process', 1)
@@ -132,13 +149,17 @@ async def claim_reward(account, reward_data, reward_name, required_claim=None, i
     # Handle rewards based on progress or availability
     if is_progress_based and current_process < target_process:
         logger.info(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.YELLOW}{reward_name} is not ready yet. Progress: {current_process}/{target_process}{Fore.RESET}")
-        return
+        return False
 
     # Reward available for claiming
     if reward_data.get('status') == "AVAILABLE":
         logger.info(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.GREEN}{reward_name} reward is available for claiming{Fore.RESET}")
-        await complete_reward_claim(account, reward_data['id'], reward_name)
-        account.claimed_rewards.add(reward_name.replace(" ", "-"))
+        if not await complete_reward_claim(account, reward_data['id'], reward_name):
+            # Keep polling the mission list; dependents stay waiting until the claim really succeeds
+            invalidate_cache(account, "MISSION")
+            return False
+        mark_claimed(account, reward_name)
+        return True
 
     # Reward locked, handle locked and progress-based cases
     elif reward_data.get('status') == "LOCK":
@@ -150,25 +171,57 @@ async def claim_reward(account, reward_data, reward_name, required_claim=None, i
             # Optionally try to claim again or mark it as ready
 
         else:
-            remain_time = int(reward_data.get('remain_time', 0)) / 1000
-            time_remaining = str(timedelta(seconds=remain_time)).split('.')[0]
-            logger.info(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.YELLOW}{reward_name} will be available in... {time_remaining}{Fore.RESET}")
+            return schedule_reward(account, reward_data, reward_name, required_claim)
+        return False
 
     # Reward will be available soon (handle unanticipated or specific statuses)
     elif reward_data.get('status') in ["SOON", "PENDING", "WAITING"]:
-        remain_time = int(reward_data.get('remain_time', 0)) / 1000
-        time_remaining = str(timedelta(seconds=remain_time)).split('.')[0]
-        logger.info(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.YELLOW}{reward_name} will be available in... {time_remaining}{Fore.RESET}")
+        return schedule_reward(account, reward_data, reward_name, required_claim)
 
     # Handle rewards that are already completed
     elif reward_data.get('status') == "COMPLETED":
         logger.info(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.GREEN}{reward_name} has already been completed and claimed.{Fore.RESET}")
-        account.claimed_rewards.add(reward_name.replace(" ", "-"))
+        mark_claimed(account, reward_name)
+        return True
 
     else:
         logger.warning(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Unhandled status '{reward_data.get('status')}' for {reward_name}.{Fore.RESET}")
+        return False
+
+# Register a wake-up at the mission's remain_time instead of waiting for the next MISSION poll
+def schedule_reward(account, reward_data, reward_name, required_claim=None):
+    remain_time = int(reward_data.get('remain_time', 0)) / 1000
+    time_remaining = str(timedelta(seconds=remain_time)).split('.')[0]
+    logger.info(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.YELLOW}{reward_name} will be available in... {time_remaining}{Fore.RESET}")
+
+    if remain_time <= 0:
+        return False
+
+    schedule_claim(account, reward_data['id'], reward_name, remain_time, required_claim)
+    return True
 
-# Finalize the reward claim and print the results
+# Record a claimed reward and release the rewards that depend on it
+def mark_claimed(account, reward_name):
+    claimed_name = reward_name.replace(" ", "-")
+    account.claimed_rewards.add(claimed_name)
+    mark_dirty(account)
+    release_dependents(account, claimed_name)
+
+# Claim a mission when its scheduled wake-up fires
+async def claim_scheduled_reward(account, mission_id, reward_name):
+    logger.info(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.GREEN}{reward_name} is due, claiming now{Fore.RESET}")
+
+    if await complete_reward_claim(account, mission_id, reward_name):
+        mark_claimed(account, reward_name)
+    else:
+        # Let the next sync look at the mission list again
+        invalidate_cache(account, "MISSION")
+
+# Start the scheduler that claims missions at their remain_time
+def start_reward_scheduler():
+    start_claim_scheduler(claim_scheduled_reward)
+
+# Finalize the reward claim and print the results; returns True when the claim succeeded
 async def complete_reward_claim(account, mission_id, reward_type):
     try:
         data = {"mission_id": str(mission_id)}
@@ -177,11 +230,17 @@ async def complete_reward_claim(account, mission_id, reward_type):
 
         # Handle the response based on success
         if response.get('success'):
+            # The claim changes both the point balance and the mission list
+            invalidate_cache(account, "EARN_INFO", "MISSION")
             earned_points = response['data']['earned_points']
+            record_points(earned_points)
             logger.info(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.GREEN}{reward_type} Reward Claimed:{Fore.RESET} {Fore.CYAN}{earned_points} points{Fore.RESET}")
+            return True
 
         else:
             logger.info(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Failed to claim {reward_type} reward:{Fore.RESET} {Fore.RED}{response}{Fore.RESET}")
 
     except Exception as e:
         logger.info(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Error claiming {reward_type} reward:{Fore.RESET} {Fore.RED}{e}{Fore.RESET}")
+
+    return False
@@ -1,3 +1,12 @@
 from .api_client import send_request, retry_request
-from .token_manager import processed_tokens, mark_token, mask_token, load_tokens
-from .proxy_manager import get_proxy_choice, assign_proxies, resolve_ip
\ No newline at end of file
+from .response_cache import cached_request, cache_response, extend_cache, invalidate_cache
+from .token_manager import processed_tokens, mark_token, mask_token, load_tokens, start_token_watcher, stop_token_watcher
+from .proxy_manager import get_proxy_choice, ask_proxy_choice, resolve_proxy_choice, load_proxies, assign_proxies, resolve_ip
+from .session_manager import close_sessions
+from .worker_pool import get_worker_pool, close_worker_pool
+from .round_stats import record_ping, record_retry, record_points, add_round_listener, publish_round, merge_stats
+from .round_stats import log_round_summary
+from .state_store import restore_accounts, mark_dirty, start_state_writer, close_state_store
+from .metrics import start_metrics_server, stop_metrics_server, render_metrics
+from .watchdog import start_watchdog, stop_watchdog
+from .health import is_available, is_quarantined, load_quarantined
@@ -1,105 +1,164 @@
 import asyncio
 import json
-import random
-import requests
 
 from curl_cffi import requests
 from urllib.parse import urlparse
-from utils.settings import DOMAIN_API, logger, Fore
+from utils.settings import DOMAIN_API, BACKOFF_BASE, logger, Fore
+from utils.services import clock, codec
+from utils.services.session_manager import acquire_session
+from utils.services.retry_policy import CircuitOpenError, retry_budget, get_breaker, get_max_attempts, backoff_delay
+from utils.services.rate_limiter import get_rate_limiter, parse_retry_after
+from utils.services.round_stats import record_retry
+from utils.services.latency_tracker import record_latency, get_timeout
+from utils.services.health import AccountUnavailableError, is_available, is_quarantined, record_success, record_failure, quarantine
+from utils.services.metrics import requests_total, request_duration, requests_in_flight, retries_total, backoff_seconds
 
 
-# Function to build HTTP headers dynamically with hardcoded User-Agent
-async def build_headers(url, account, method="POST", data=None):
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36"
+
+# Necessary headers
+NECESSARY_HEADERS = {
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": "https://app.nodepay.ai/",
+    "Origin": "chrome-extension://lgmpfmgeabnnlemejacfljbmonaomfmm",
+    "Connection": "keep-alive",
+}
+
+# Optional headers
+OPTIONAL_HEADERS = {
+    "Sec-CH-UA": '"Not/A)Brand";v="8", "Chromium";v="126", "Herond";v="126"',
+    "Sec-Ch-Ua-Mobile": "?0",
+    "Sec-Ch-Ua-Platform": '"Windows"',
+    "Sec-Fetch-Dest": "empty",
+    "Sec-Fetch-Mode": "cors",
+    "Sec-Fetch-Site": "cors-site",
+    "Pragma": "no-cache",
+    "Cache-Control": "no-cache",
+}
+
+# Headers every request carries besides the per-account Authorization
+BASE_HEADERS = {
+    "Content-Type": "application/json",
+    "User-Agent": USER_AGENT,
+}
+
+# Function to precompute the header template of every endpoint in DOMAIN_API
+def build_endpoint_templates():
     """
-    Build headers for API requests dynamically with fixed User-Agent.
+    Build endpoint header templates once, keyed by URL.
     """
-    # Start with base headers
-    headers = {
-        "Authorization": f"Bearer {account.token}",
-        "Content-Type": "application/json",
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36",
+    extension_urls = set(DOMAIN_API["PING"]) | {
+        DOMAIN_API["EARN_INFO"], DOMAIN_API["MISSION"], DOMAIN_API["COMPLETE_MISSION"], DOMAIN_API["ACTIVATE"]
     }
+    extension_template = {**BASE_HEADERS, **NECESSARY_HEADERS, **OPTIONAL_HEADERS}
 
-    # Add endpoint-specific headers
-    endpoint_specific_headers = get_endpoint_headers(url)
-    headers.update(endpoint_specific_headers)
+    templates = {}
+    for endpoint in DOMAIN_API.values():
+        for url in (endpoint if isinstance(endpoint, list) else [endpoint]):
+            templates[url] = extension_template if url in extension_urls else DEFAULT_TEMPLATE
+    return templates
 
-    # Validate serializability of data
-    if method in ["POST", "PUT"] and data is not None:
-        if not isinstance(data, dict):
-            raise ValueError("Payload must be a dictionary.")
-        try:
-            json.dumps(data, ensure_ascii=False)
-        except (TypeError, ValueError) as e:
-            raise ValueError(f"Invalid payload data: {e}")
+# Default minimal headers
+DEFAULT_TEMPLATE = {**BASE_HEADERS, "Accept": "application/json"}
+ENDPOINT_TEMPLATES = build_endpoint_templates()
 
-    return headers
+# Endpoint name from DOMAIN_API for every URL, e.g. "PING"
+ENDPOINT_NAMES = {
+    url: name
+    for name, endpoint in DOMAIN_API.items()
+    for url in (endpoint if isinstance(endpoint, list) else [endpoint])
+}
+
+# Function to build HTTP headers dynamically with hardcoded User-Agent
+def build_headers(url, account):
+    """
+    Overlay the account's Authorization on the endpoint's shared header template.
+    """
+    return {"Authorization": account.authorization, **ENDPOINT_TEMPLATES.get(url, DEFAULT_TEMPLATE)}
 
 # Function to return endpoint-specific headers based on the API
 def get_endpoint_headers(url):
     """
     Return endpoint-specific headers based on the API.
     """
-    EARN_MISSION_SET = {DOMAIN_API["EARN_INFO"], DOMAIN_API["MISSION"], DOMAIN_API["COMPLETE_MISSION"]}
-    PING_LIST = DOMAIN_API["PING"]
-    ACTIVATE_URL = DOMAIN_API["ACTIVATE"]
-
-    # Necessary headers
-    necessary_headers = {
-        "Accept": "application/json, text/plain, */*",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Referer": "https://app.nodepay.ai/",
-        "Origin": "chrome-extension://lgmpfmgeabnnlemejacfljbmonaomfmm",
-        "Connection": "keep-alive",
-    }
-
-    # Optional headers
-    optional_headers = {
-        "Sec-CH-UA": '"Not/A)Brand";v="8", "Chromium";v="126", "Herond";v="126"',
-        "Sec-Ch-Ua-Mobile": "?0",
-        "Sec-Ch-Ua-Platform": '"Windows"',
-        "Sec-Fetch-Dest": "empty",
-        "Sec-Fetch-Mode": "cors",
-        "Sec-Fetch-Site": "cors-site",
-        "Pragma": "no-cache",
-        "Cache-Control": "no-cache",
-    }
-
-    # Check if the URL matches specific sets
-    if url in PING_LIST or url in EARN_MISSION_SET or url == ACTIVATE_URL:
-        return {**necessary_headers, **optional_headers}
+    return ENDPOINT_TEMPLATES.get(url, DEFAULT_TEMPLATE)
 
-    # Default minimal headers
-    return {"Accept": "application/json"}
+# Function to validate and serialize the request payload exactly once
+def encode_payload(method, data):
+    """
+    Serialize the payload to JSON bytes, rejecting anything that is not a dictionary.
+    """
+    if method not in ["POST", "PUT"] or data is None:
+        return None
+    if not isinstance(data, dict):
+        raise ValueError("Payload must be a dictionary.")
+    try:
+        return codec.dumps(data)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid payload data: {e}")
 
 # Function to send HTTP requests with error handling and custom headers
-async def send_request(url, data, account, method="POST", timeout=120):
+async def send_request(url, data, account, method="POST", timeout=None):
     """
     Perform HTTP requests with proper headers and error handling.
     """
-    headers = await build_headers(url, account, method, data)
-    proxies = {"http": account.proxy, "https": account.proxy} if account.proxy else None
+    headers = build_headers(url, account)
+    body = encode_payload(method, data)
+    timeout = timeout or get_timeout(url)
+    limiter = get_rate_limiter(url)
+    endpoint = ENDPOINT_NAMES.get(url, "OTHER")
     response = None
-
-    parsed_url = urlparse(url)
-    path = parsed_url.path
+    status = "error"
 
     # Ensure headers are valid
     if not headers:
-        logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}No headers generated for URL: {path}{Fore.RESET}")
+        logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}No headers generated for URL: {urlparse(url).path}{Fore.RESET}")
         raise ValueError("Failed to generate headers")
 
     try:
-        if method == "GET":
-            response = requests.get(url, headers=headers, proxies=proxies, impersonate="safari15_5", timeout=timeout)
-        else:
-            response = requests.post(url, json=data, headers=headers, impersonate="safari15_5", proxies=proxies, timeout=timeout)
+        # Every account waits on the same per-host bucket, so a 429 slows the whole fleet down at once
+        if limiter is not None:
+            await limiter.acquire()
+
+        # Latency is measured from the send, so time spent waiting on the rate limiter is not counted
+        started = clock.monotonic()
+        requests_in_flight.inc()
+        try:
+            # Reuse the pooled session for this (host, proxy) route so keep-alive connections survive between calls
+            async with acquire_session(url, account.proxy) as session:
+                if method == "GET":
+                    response = await session.get(url, headers=headers, timeout=timeout)
+                else:
+                    response = await session.post(url, data=body, headers=headers, timeout=timeout)
+            if response is not None:
+                status = str(response.status_code)
+        except requests.exceptions.Timeout:
+            status = "timeout"
+            raise
+        except asyncio.CancelledError:
+            # A hedged ping whose twin answered first
+            status = "cancelled"
+            raise
+        finally:
+            elapsed = clock.monotonic() - started
+            requests_in_flight.dec()
+            requests_total.inc(endpoint, status)
+            request_duration.observe(endpoint, status, value=elapsed)
+            if status == "timeout":
+                record_latency(url, timeout)
+            elif status.startswith("2"):
+                record_latency(url, elapsed)
 
         if response is None:  # Additional safety check
             raise ValueError("Received no response from the server.")
 
-        response.raise_for_status()
-        return response.json()
+        # curl_cffi's raise_for_status leaves e.response unset, which the 429 and 401/403 handling rely on
+        if response.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"HTTP Error {response.status_code}", response=response)
+        if limiter is not None:
+            limiter.on_success()
+        return codec.loads(response.content)
 
     except json.JSONDecodeError:
         logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Failed to decode JSON response:{Fore.RESET} {response.text if response else 'No response'}")
@@ -111,9 +170,12 @@ async def send_request(url, data, account, method="POST", timeout=120):
 
     except requests.exceptions.HTTPError as e:
         if e.response.status_code == 429:
-            retry_after = int(e.response.headers.get("Retry-After", 1))
-            logger.warning(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.YELLOW}Rate limited (429). Retrying after {retry_after} seconds...{Fore.RESET}")
-            await asyncio.sleep(retry_after)
+            retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+            logger.warning(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.YELLOW}Rate limited (429). Retrying after {retry_after:.0f} seconds...{Fore.RESET}")
+            if limiter is not None:
+                limiter.on_rate_limited(retry_after)
+            else:
+                await asyncio.sleep(retry_after)
         else:
             short_error = str(e).split(" See")[0]
             logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}HTTP error occurred:{Fore.RESET} {short_error}")
@@ -121,46 +183,110 @@ async def send_request(url, data, account, method="POST", timeout=120):
 
     except requests.exceptions.RequestException as e:
         short_error = str(e).split(" See")[0]
-        logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Request error:{Fore.RESET} {Fore.CYAN}{path}{Fore.RESET} {short_error}")
+        logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Request error:{Fore.RESET} {Fore.CYAN}{urlparse(url).path}{Fore.RESET} {short_error}")
         raise
 
 # Function to send HTTP requests with retry logic using exponential backoff
-async def retry_request(url, data, account, method="POST", max_retries=3):
+async def retry_request(url, data, account, method="POST", max_retries=None):
     """
-    Retry requests using exponential backoff.
+    Retry requests with jittered backoff, bounded by the endpoint's attempts, the retry budget and the host's circuit breaker.
     """
-    retry_count = 0
-    parsed_url = urlparse(url)
-    path = parsed_url.path
+    max_attempts = max_retries or get_max_attempts(ENDPOINT_NAMES.get(url))
+    breaker = get_breaker(url)
+    attempt = 0
+
+    # Host-side failures (5xx, 429, open circuit) say nothing about the account and do not count against its health
+    account_failed = False
+
+    while True:
+        attempt += 1
+
+        # Quarantined and cooling-down accounts cost no requests, retries or backoff sleeps
+        if not is_available(account):
+            state = "quarantined" if is_quarantined(account) else "cooling down"
+            raise AccountUnavailableError(f"{Fore.YELLOW}Account {account.index} is {state}{Fore.RESET}")
 
-    while retry_count < max_retries:
+        # Fail fast while the host is known to be down instead of adding to the load
+        if not breaker.allow():
+            raise CircuitOpenError(f"{Fore.RED}Circuit open for {Fore.RESET}{Fore.CYAN}{breaker.host}{Fore.RESET}")
+
+        retry_budget.record_request()
         try:
             response = await send_request(url, data, account, method)
+            breaker.record_success()
+            record_success(account)
             return response # Return the response if successful
 
+        except asyncio.CancelledError:
+            # A hedged ping that lost the race; give back the half-open probe slot it may hold
+            breaker.record_neutral()
+            raise
+
         except requests.exceptions.HTTPError as e:
-            logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}HTTP Error: {e.response.status_code} - {Fore.RESET} {e}")
+            status_code = getattr(e.response, "status_code", 0)
+            logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}HTTP Error: {status_code} - {Fore.RESET} {e}")
+
+            # 5xx means the host is struggling; 429 is left to the rate limiter; other 4xx prove the host is up
+            if status_code >= 500:
+                breaker.record_failure()
+            elif status_code == 429:
+                breaker.record_neutral()
+            else:
+                breaker.record_success()
+                account_failed = True
+
+            # The token is expired or revoked: retrying cannot help
+            if status_code in (401, 403):
+                logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}{status_code}: Token rejected, check it or the proxy.{Fore.RESET}")
+                quarantine(account, status_code)
+                raise AccountUnavailableError(f"{Fore.RED}Account {account.index} is quarantined{Fore.RESET}")
 
-            if hasattr(e.response, "status_code") and e.response.status_code == 403:
-                logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}403 Forbidden: Check permissions or proxy.{Fore.RESET}")
-                return None
+        except requests.exceptions.ProxyError:
+            # A broken proxy belongs to this account, not to the host
+            breaker.record_neutral()
+            account_failed = True
+
+        except requests.exceptions.ConnectionError as e:
+            # Through a proxy the connect goes to the proxy: a dead one fails with curl error 7 or a connect timeout
+            if account.proxy:
+                breaker.record_neutral()
+                account_failed = True
+            else:
+                breaker.record_failure()
+                if isinstance(e, requests.exceptions.Timeout):
+                    short_error = str(e).split(" See")[0]
+                    logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Timeout error occurred{Fore.RESET} {short_error}")
 
         except requests.exceptions.Timeout as e:
+            breaker.record_failure()
             short_error = str(e).split(" See")[0]
             logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Timeout error occurred{Fore.RESET} {short_error}")
 
-        except Exception as e:
-            retry_count += 1
-            delay = min(await exponential_backoff(retry_count), 30)
-            logger.info(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - Retry attempt {retry_count + 1}: Retrying after {delay:.2f} seconds...")
+        except Exception:
+            breaker.record_failure()
+
+        if attempt >= max_attempts:
+            break
+
+        if not retry_budget.try_spend():
+            logger.warning(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.YELLOW}Retry budget exhausted, not retrying {urlparse(url).path}{Fore.RESET}")
+            break
+
+        record_retry()
+        retries_total.inc(ENDPOINT_NAMES.get(url, "OTHER"))
+        delay = await exponential_backoff(attempt)
+        backoff_seconds.inc(ENDPOINT_NAMES.get(url, "OTHER"), amount=delay)
+        logger.info(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - Retry attempt {attempt + 1}: Retrying after {delay:.2f} seconds...")
 
-    raise Exception(f"{Fore.RED}Max retries reached for {Fore.RESET}{Fore.CYAN}{path}{Fore.RESET}")
+    if account_failed:
+        record_failure(account)
+    raise Exception(f"{Fore.RED}Max retries reached for {Fore.RESET}{Fore.CYAN}{urlparse(url).path}{Fore.RESET}")
 
 # Function to implement exponential backoff delay during retries
-async def exponential_backoff(retry_count, base_delay=1):
+async def exponential_backoff(retry_count, base_delay=BACKOFF_BASE):
     """
-    Perform exponential backoff for retries.
+    Perform full-jitter exponential backoff for retries.
     """
-    delay = min(base_delay * (2 ** retry_count) + random.uniform(0, 1), 30)
+    delay = backoff_delay(retry_count, base_delay)
     await asyncio.sleep(delay)
     return delay
@@ -0,0 +1,90 @@
+import asyncio
+import selectors
+import time
+
+
+# Real wall-clock and monotonic time
+class SystemClock:
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+# Simulated time that only moves when the event loop has nothing left to run
+class VirtualClock:
+    def __init__(self, start=None):
+        self.start = time.time() if start is None else start
+        self.elapsed = 0.0
+
+    def time(self):
+        return self.start + self.elapsed
+
+    def monotonic(self):
+        return self.elapsed
+
+    def advance(self, seconds):
+        self.elapsed += seconds
+
+# Clock used by the schedulers, caches, limiters and breakers
+current_clock = SystemClock()
+
+def now():
+    return current_clock.time()
+
+def monotonic():
+    return current_clock.monotonic()
+
+# Swap the clock, returning the previous one
+def install_clock(clock):
+    global current_clock
+
+    previous, current_clock = current_clock, clock
+    return previous
+
+# Virtual time every loop iteration costs
+MIN_STEP = 1e-6
+
+# Selector that jumps the virtual clock to the next timer instead of blocking on it
+class VirtualSelector:
+    def __init__(self, clock, selector=None):
+        self.clock = clock
+        self.selector = selector or selectors.DefaultSelector()
+
+    def select(self, timeout=None):
+        ready = self.selector.select(0)
+        if ready:
+            return ready
+
+        # No timers at all: only real I/O (e.g. an executor finishing) can wake the loop
+        if timeout is None:
+            return self.selector.select(None)
+
+        # Every iteration moves time forward a little, like a real loop would, so code polling the clock makes progress
+        self.clock.advance(max(timeout, MIN_STEP))
+        return []
+
+    def __getattr__(self, name):
+        return getattr(self.selector, name)
+
+# Event loop whose timers run on a VirtualClock, so asyncio.sleep and wait_for cost no wall time
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    def __init__(self, clock):
+        self.clock = clock
+        super().__init__(VirtualSelector(clock))
+
+    def time(self):
+        return self.clock.monotonic()
+
+# Run a coroutine to completion on virtual time, with the virtual clock installed for its duration
+def run_virtual(coro, start=None):
+    clock = VirtualClock(start)
+    loop = VirtualEventLoop(clock)
+    previous = install_clock(clock)
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(coro)
+    finally:
+        install_clock(previous)
+        asyncio.set_event_loop(None)
+        loop.close()
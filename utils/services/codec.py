@@ -0,0 +1,24 @@
+import json
+
+from utils.settings import ACCELERATED_RUNTIME
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# orjson is only used with ACCELERATED_RUNTIME; its decode errors subclass json.JSONDecodeError, so callers catch either
+USE_ORJSON = ACCELERATED_RUNTIME and orjson is not None
+
+# Serialize data to UTF-8 JSON bytes
+def dumps(data):
+    if USE_ORJSON:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+# Parse JSON from bytes or text
+def loads(data):
+    if USE_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
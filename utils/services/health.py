@@ -0,0 +1,80 @@
+import sys
+
+from utils.services import clock
+from utils.settings import ACCOUNT_FAILURE_THRESHOLD, ACCOUNT_COOLDOWN_BASE, ACCOUNT_COOLDOWN_MAX, QUARANTINE_FILE
+from utils.settings import CONNECTION_STATES, logger, Fore
+
+
+# Raised instead of sending a request for an account that is quarantined or cooling down
+class AccountUnavailableError(Exception):
+    pass
+
+# Account health follows CONNECTION_STATES:
+#   NONE_CONNECTION -> CONNECTED on a successful request
+#   any -> DISCONNECTED after ACCOUNT_FAILURE_THRESHOLD consecutive failures, with an exponential cooldown
+#   DISCONNECTED -> CONNECTED on the first success once the cooldown is over
+#   any -> FAILED (quarantined for good) when the API rejects the token with 401/403
+
+# Whether the API has rejected the account's token
+def is_quarantined(account):
+    return account.status_connect == CONNECTION_STATES["FAILED"]
+
+# Whether requests may be sent for the account right now
+def is_available(account):
+    if is_quarantined(account):
+        return False
+    return account.cooldown_until is None or account.cooldown_until <= clock.now()
+
+# A request for the account succeeded: clear its failure streak
+def record_success(account):
+    if is_quarantined(account):
+        return
+    account.status_connect = CONNECTION_STATES["CONNECTED"]
+    account.retries = 0
+    account.cooldown_until = None
+
+# A request for the account failed for a reason of its own; cool it down once the streak reaches the threshold
+def record_failure(account):
+    if is_quarantined(account):
+        return
+    account.retries += 1
+    if account.retries < ACCOUNT_FAILURE_THRESHOLD:
+        return
+
+    cooldown = min(ACCOUNT_COOLDOWN_BASE * 2 ** (account.retries - ACCOUNT_FAILURE_THRESHOLD), ACCOUNT_COOLDOWN_MAX)
+    account.status_connect = CONNECTION_STATES["DISCONNECTED"]
+    account.cooldown_until = clock.now() + cooldown
+    logger.warning(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.YELLOW}{account.retries} failures in a row, pausing the account for {cooldown:.0f} seconds{Fore.RESET}")
+
+# Tokens quarantined by this or an earlier run
+quarantined_tokens = set()
+
+# Add the tokens quarantined by earlier runs or other shards from the quarantine file, so they are never loaded again
+def load_quarantined():
+    if not QUARANTINE_FILE:
+        return quarantined_tokens
+    try:
+        with open(QUARANTINE_FILE, 'r') as file:
+            quarantined_tokens.update(sys.intern(token) for token in (line.strip() for line in file) if token)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.error(f"{Fore.CYAN}00{Fore.RESET} - {Fore.RED}Error loading quarantined tokens: {e}{Fore.RESET}")
+    return quarantined_tokens
+
+# The API rejected the token: stop all requests for the account and record the token in QUARANTINE_FILE
+def quarantine(account, status_code):
+    if is_quarantined(account):
+        return
+    account.status_connect = CONNECTION_STATES["FAILED"]
+    logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Token rejected with {status_code}, quarantining the account{Fore.RESET}")
+
+    if account.token in quarantined_tokens:
+        return
+    quarantined_tokens.add(account.token)
+    if QUARANTINE_FILE:
+        try:
+            with open(QUARANTINE_FILE, 'a') as file:
+                file.write(f"{account.token}\n")
+        except OSError as e:
+            logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Error writing {QUARANTINE_FILE}: {e}{Fore.RESET}")
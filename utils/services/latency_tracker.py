@@ -0,0 +1,53 @@
+from collections import deque
+
+from utils.services.round_stats import percentile
+from utils.settings import REQUEST_TIMEOUT_MIN, REQUEST_TIMEOUT_MAX, TIMEOUT_MULTIPLIER, LATENCY_WINDOW
+
+
+# Samples needed before percentiles replace the configured maximum timeout
+MIN_SAMPLES = 20
+REFRESH_EVERY = 10
+
+# Recent latencies of one endpoint URL and the percentiles derived from them
+class EndpointLatency:
+    __slots__ = ("samples", "since_refresh", "p95", "p99")
+
+    def __init__(self):
+        self.samples = deque(maxlen=LATENCY_WINDOW)
+        self.since_refresh = 0
+        self.p95 = None
+        self.p99 = None
+
+    def record(self, latency):
+        self.samples.append(latency)
+        self.since_refresh += 1
+
+        # Re-derive the percentiles every few samples instead of sorting on every request
+        if len(self.samples) >= MIN_SAMPLES and self.since_refresh >= REFRESH_EVERY:
+            ordered = sorted(self.samples)
+            self.p95 = percentile(ordered, 0.95)
+            self.p99 = percentile(ordered, 0.99)
+            self.since_refresh = 0
+
+endpoint_latencies = {}
+
+# Record how long a request to the URL took; timed-out requests record their timeout so a slowing host raises it
+def record_latency(url, latency):
+    tracker = endpoint_latencies.get(url)
+    if tracker is None:
+        tracker = endpoint_latencies[url] = EndpointLatency()
+    tracker.record(latency)
+
+# Timeout for the next request: a multiple of the observed p99, within REQUEST_TIMEOUT_MIN..REQUEST_TIMEOUT_MAX
+def get_timeout(url):
+    tracker = endpoint_latencies.get(url)
+    if tracker is None or tracker.p99 is None:
+        return REQUEST_TIMEOUT_MAX
+    return min(max(tracker.p99 * TIMEOUT_MULTIPLIER, REQUEST_TIMEOUT_MIN), REQUEST_TIMEOUT_MAX)
+
+# How long to wait for the URL before hedging to another one: its p95, or REQUEST_TIMEOUT_MIN until it is known
+def get_hedge_delay(url):
+    tracker = endpoint_latencies.get(url)
+    if tracker is None or tracker.p95 is None:
+        return REQUEST_TIMEOUT_MIN
+    return tracker.p95
@@ -0,0 +1,150 @@
+import asyncio
+
+from utils.settings import METRICS_HOST, METRICS_PORT, logger, Fore
+
+
+# Default latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Every metric registered in this process, rendered in registration order
+registry = []
+
+# Render a label set as {name="value",...}
+def format_labels(names, values, extra=None):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+# Monotonically increasing value per label set
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.values = {}
+        registry.append(self)
+
+    def inc(self, *label_values, amount=1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self):
+        for label_values, value in self.values.items():
+            yield f"{self.name}{format_labels(self.labels, label_values)} {value}"
+
+# Value that can go up and down
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *label_values, value):
+        self.values[label_values] = value
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+# Cumulative bucket counts, sum and count per label set
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self.values = {}
+        registry.append(self)
+
+    def observe(self, *label_values, value):
+        entry = self.values.get(label_values)
+        if entry is None:
+            entry = self.values[label_values] = [[0] * len(self.buckets), 0.0, 0]
+
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry[0][position] += 1
+                break
+        entry[1] += value
+        entry[2] += 1
+
+    def samples(self):
+        for label_values, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = format_labels(self.labels, label_values, 'le="%s"' % bound)
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            bucket_labels = format_labels(self.labels, label_values, 'le="+Inf"')
+            yield f"{self.name}_bucket{bucket_labels} {count}"
+            yield f"{self.name}_sum{format_labels(self.labels, label_values)} {total}"
+            yield f"{self.name}_count{format_labels(self.labels, label_values)} {count}"
+
+requests_total = Counter("nodepay_requests_total", "HTTP requests by endpoint and status.", ("endpoint", "status"))
+request_duration = Histogram("nodepay_request_duration_seconds", "HTTP request latency by endpoint and status.", ("endpoint", "status"))
+requests_in_flight = Gauge("nodepay_requests_in_flight", "HTTP requests currently in flight.")
+retries_total = Counter("nodepay_retries_total", "Requests retried by retry_request.", ("endpoint",))
+backoff_seconds = Counter("nodepay_backoff_seconds_total", "Seconds spent in retry backoff.", ("endpoint",))
+pings_total = Counter("nodepay_pings_total", "Account pings by result.", ("result",))
+scheduler_lag = Histogram("nodepay_scheduler_lag_seconds", "Delay between a ping's deadline and its dispatch.", buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 30))
+round_duration = Histogram("nodepay_round_duration_seconds", "Duration of each ping_all_accounts cycle.", buckets=(60, 300, 900, 1800, 3600, 7200))
+queue_depth = Gauge("nodepay_worker_queue_depth", "Jobs waiting for a worker.")
+loop_lag = Histogram("nodepay_event_loop_lag_seconds", "How late the event loop woke up for a timer.", buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 5))
+loop_stalls = Counter("nodepay_event_loop_stalls_total", "Times the event loop was blocked longer than LOOP_LAG_THRESHOLD.")
+
+# Render every registered metric in the Prometheus text exposition format
+def render_metrics():
+    lines = []
+    for metric in registry:
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+# Answer a single HTTP request on the metrics port
+async def handle_metrics_request(reader, writer):
+    try:
+        request_line = await reader.readline()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, body = "200 OK", render_metrics().encode("utf-8")
+        else:
+            status, body = "404 Not Found", b"Not Found\n"
+
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+metrics_server = None
+
+# Serve /metrics on METRICS_HOST:METRICS_PORT + offset when METRICS_PORT is set
+async def start_metrics_server(offset=0):
+    global metrics_server
+
+    if METRICS_PORT <= 0 or metrics_server is not None:
+        return
+
+    port = METRICS_PORT + offset
+    try:
+        metrics_server = await asyncio.start_server(handle_metrics_request, METRICS_HOST, port)
+        logger.info(f"{Fore.CYAN}00{Fore.RESET} - Metrics available at {Fore.CYAN}http://{METRICS_HOST}:{port}/metrics{Fore.RESET}")
+    except OSError as e:
+        logger.error(f"{Fore.CYAN}00{Fore.RESET} - {Fore.RED}Failed to start metrics server on port {port}:{Fore.RESET} {e}")
+
+# Stop the metrics server
+async def stop_metrics_server():
+    global metrics_server
+
+    if metrics_server is not None:
+        metrics_server.close()
+        await metrics_server.wait_closed()
+        metrics_server = None
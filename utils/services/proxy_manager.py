@@ -1,22 +1,23 @@
-import aiohttp
+import asyncio
+import sys
 
 from urllib.parse import urlparse
-from utils.settings import logger, Fore
+from utils.services import clock, codec
+from utils.services.session_manager import get_transport
+from utils.settings import IP_CACHE_TTL, IP_LOOKUP_URL, PROXIES_FILE, USE_PROXIES, logger, Fore
 
 
-# Load proxies from a file
+# Public IPs cached per proxy as (ip, expires_at), plus the lookups currently in flight
+ip_cache = {}
+ip_lookups = {}
+
+# Load proxies from a file; a missing file means no proxies
 def load_proxies():
     try:
-        with open('proxies.txt', 'r') as file:
-            proxies = file.read().splitlines()
-
-        if not proxies:
-            logger.warning(f"{Fore.CYAN}00{Fore.RESET} - {Fore.YELLOW}No proxies found in proxies.txt. Running without proxies.{Fore.RESET}")
+        with open(PROXIES_FILE, 'r') as file:
+            return [proxy for proxy in (line.strip() for line in file) if proxy]
 
-        return proxies
-    
     except FileNotFoundError:
-        logger.warning(f"{Fore.CYAN}00{Fore.RESET} - {Fore.YELLOW}File proxies.txt not found. Running without proxies.{Fore.RESET}")
         return []
 
     except Exception as e:
@@ -24,17 +25,34 @@ def load_proxies():
         return []
 
 # Prompt the user to decide whether to use proxies
-def get_proxy_choice():
+def ask_proxy_choice():
+    # Under a supervisor or service manager nobody can answer, so run without proxies instead of blocking
+    if not sys.stdin.isatty():
+        logger.warning(f"{Fore.CYAN}00{Fore.RESET} - {Fore.YELLOW}No terminal to ask about proxies; running without them (use --proxies or USE_PROXIES=true){Fore.RESET}")
+        return False
+
     while (user_input := input("Do you want to use proxy? (yes/no)? ").strip().lower()) not in ['yes', 'no']:
         print("Invalid input. Please enter 'yes' or 'no'.")
 
     print(f"You selected: {'Yes' if user_input == 'yes' else 'No'}, ENJOY!\n")
-
-    if user_input == 'yes':
-        proxies = load_proxies()
+    return user_input == 'yes'
+
+# Decide whether proxies are used: the explicit choice, then USE_PROXIES, then the prompt
+def resolve_proxy_choice(use_proxies=None):
+    if use_proxies is None:
+        use_proxies = USE_PROXIES
+    if use_proxies is None:
+        use_proxies = ask_proxy_choice()
+    return use_proxies
+
+# Load proxies if chosen; proxies already read from the file can be passed in to avoid reading it again
+def get_proxy_choice(use_proxies=None, proxies=None):
+    if resolve_proxy_choice(use_proxies):
+        if proxies is None:
+            proxies = load_proxies()
 
         if not proxies:
-            logger.error(f"{Fore.CYAN}00{Fore.RESET} - {Fore.RED}No proxies found in proxies.txt. Please add valid proxies.{Fore.RESET}")
+            logger.error(f"{Fore.CYAN}00{Fore.RESET} - {Fore.RED}No proxies found in {PROXIES_FILE}. Please add valid proxies.{Fore.RESET}")
             return []
         return proxies
     return []
@@ -60,13 +78,21 @@ def get_proxy_ip(proxy_url):
 async def get_ip_address(proxy=None):
     try:
         proxy_ip = get_proxy_ip(proxy) if proxy else "Unknown"
-        url = "https://api.ipify.org?format=json"
-        
+        url = IP_LOOKUP_URL
+
+        transport = get_transport()
+        if transport is not None:
+            response = await transport.get(url, headers={}, timeout=10)
+            return codec.loads(response.content).get("ip", "Unknown") if response.status_code == 200 else "Unknown"
+
+        # aiohttp is only needed for this lookup, so it is not imported at startup
+        import aiohttp
+
         async with aiohttp.ClientSession() as session:
             async with session.get(url, proxy=proxy, ssl=False) as response:
                 
                 if response.status == 200:
-                    result = await response.json()
+                    result = codec.loads(await response.read())
                     return result.get("ip", "Unknown")
                 
                 return "Unknown"
@@ -77,13 +103,32 @@ async def get_ip_address(proxy=None):
     
     return proxy_ip
 
-# Resolves IP or proxy for the account
+# Refresh the cached IP for a proxy and release its in-flight slot
+async def refresh_ip(proxy):
+    try:
+        ip_cache[proxy] = (await get_ip_address(proxy), clock.monotonic() + IP_CACHE_TTL)
+    finally:
+        ip_lookups.pop(proxy, None)
+
+# Start a background lookup for the proxy unless one is already running
+def schedule_ip_refresh(proxy):
+    if proxy not in ip_lookups:
+        ip_lookups[proxy] = asyncio.create_task(refresh_ip(proxy))
+    return ip_lookups[proxy]
+
+# Resolves IP or proxy for the account from the cache, refreshing stale entries in the background
 async def resolve_ip(account):
     try:
-        if account.proxy and account.proxy.startswith("http"):
-            return await get_ip_address(account.proxy)
-        else:
-            return await get_ip_address()
+        proxy = account.proxy if account.proxy and account.proxy.startswith("http") else None
+        cached = ip_cache.get(proxy)
+
+        if cached is None or cached[1] <= clock.monotonic():
+            schedule_ip_refresh(proxy)
+
+        if cached is not None:
+            return cached[0]
+        return get_proxy_ip(proxy) if proxy else "Unknown"
+
     except Exception as e:
         logger.error(f"{Fore.CYAN}{account.index:02d}{Fore.RESET} - {Fore.RED}Failed to resolve proxy or IP address:{Fore.RESET} {e}")
         return "Unknown"
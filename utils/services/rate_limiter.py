@@ -0,0 +1,87 @@
+import asyncio
+
+from email.utils import parsedate_to_datetime
+
+from utils.services import clock
+from utils.services.session_manager import get_host
+from utils.settings import RATE_LIMIT_PER_HOST, RATE_LIMIT_BURST, RATE_LIMIT_MIN, RATE_LIMIT_RECOVERY
+
+
+# Token bucket shared by every account talking to one host; adapts its rate to 429 responses.
+# Callers reserve a token up front, letting the count go negative, and sleep once until their slot comes up.
+class HostRateLimiter:
+    def __init__(self, host, rate=RATE_LIMIT_PER_HOST, burst=RATE_LIMIT_BURST):
+        self.host = host
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+
+        # Time the bucket was last refilled; lies in the future while a 429 pauses the host
+        self.updated = clock.monotonic()
+
+        # Bumped by every 429, voiding the reservations made before it
+        self.epoch = 0
+
+    def refill(self, now):
+        if now <= self.updated:
+            return
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    # Wait until a request may be sent to this host
+    async def acquire(self):
+        while True:
+            now = clock.monotonic()
+            epoch = self.epoch
+            self.refill(now)
+
+            self.tokens -= 1
+            delay = max(self.updated - now, 0.0) + max(-self.tokens, 0.0) / self.rate
+            if delay <= 0:
+                return
+
+            await asyncio.sleep(delay)
+            if self.epoch == epoch:
+                return
+
+    # Pause the whole host for Retry-After and halve the rate; waiters reserve again behind the pause.
+    # The bucket resumes at the end of the pause holding what it earned meanwhile, never more than a burst.
+    def on_rate_limited(self, retry_after):
+        now = clock.monotonic()
+        self.rate = max(self.rate / 2, RATE_LIMIT_MIN)
+        resume_at = max(self.updated, now + retry_after)
+        self.tokens = min(self.burst, (resume_at - now) * self.rate)
+        self.updated = resume_at
+        self.epoch += 1
+
+    # Creep back towards the configured rate while requests succeed
+    def on_success(self):
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + RATE_LIMIT_RECOVERY)
+
+rate_limiters = {}
+
+# Return the shared limiter of the URL's host, or None when rate limiting is disabled
+def get_rate_limiter(url):
+    if RATE_LIMIT_PER_HOST <= 0:
+        return None
+
+    host = get_host(url)
+    limiter = rate_limiters.get(host)
+    if limiter is None:
+        limiter = rate_limiters[host] = HostRateLimiter(host)
+    return limiter
+
+# Parse a Retry-After header given either in seconds or as an HTTP date
+def parse_retry_after(value, default=1.0):
+    if not value:
+        return default
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - clock.now(), 0.0)
+    except (TypeError, ValueError):
+        return default
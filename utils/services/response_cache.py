@@ -0,0 +1,38 @@
+from utils.services import clock
+from utils.services.api_client import retry_request
+from utils.settings import DOMAIN_API, SESSION_CACHE_TTL, EARN_INFO_CACHE_TTL, MISSION_CACHE_TTL
+
+
+# How long a successful response of each endpoint stays fresh on the account
+CACHE_TTLS = {
+    "SESSION": SESSION_CACHE_TTL,
+    "EARN_INFO": EARN_INFO_CACHE_TTL,
+    "MISSION": MISSION_CACHE_TTL,
+}
+
+# Store a response on the account until fetched_at + the endpoint TTL
+def cache_response(account, endpoint, response, fetched_at=None):
+    fetched_at = fetched_at or clock.now()
+    account.response_cache[endpoint] = (fetched_at + CACHE_TTLS.get(endpoint, 0), response)
+
+# Return the cached response of an endpoint while it is fresh, otherwise fetch and cache it
+async def cached_request(endpoint, data, account, method="POST"):
+    cached = account.response_cache.get(endpoint)
+    if cached and cached[0] > clock.now():
+        return cached[1]
+
+    response = await retry_request(DOMAIN_API[endpoint], data, account, method)
+    if response and response.get("success"):
+        cache_response(account, endpoint, response)
+    return response
+
+# Keep a cached response fresh until the given time, e.g. the next scheduled claim
+def extend_cache(account, endpoint, until):
+    cached = account.response_cache.get(endpoint)
+    if cached and cached[0] < until:
+        account.response_cache[endpoint] = (until, cached[1])
+
+# Drop cached responses after an action that changes their data
+def invalidate_cache(account, *endpoints):
+    for endpoint in endpoints:
+        account.response_cache.pop(endpoint, None)
@@ -0,0 +1,89 @@
+import random
+
+from utils.services import clock
+from utils.services.session_manager import get_host
+from utils.settings import ENDPOINT_MAX_ATTEMPTS, MAX_ATTEMPTS, BACKOFF_BASE, BACKOFF_MAX
+from utils.settings import RETRY_BUDGET_RATIO, RETRY_BUDGET_MIN
+from utils.settings import BREAKER_FAILURE_THRESHOLD, BREAKER_OPEN_SECONDS, BREAKER_HALF_OPEN_PROBES
+
+
+# Raised instead of sending a request while the host's circuit is open
+class CircuitOpenError(Exception):
+    pass
+
+# Process-wide retry budget: every request earns RETRY_BUDGET_RATIO tokens and every retry spends one
+class RetryBudget:
+    def __init__(self, ratio=RETRY_BUDGET_RATIO, minimum=RETRY_BUDGET_MIN):
+        self.ratio = ratio
+        self.minimum = minimum
+        self.capacity = max(minimum, 1) * 10
+        self.tokens = float(minimum)
+
+    def record_request(self):
+        self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def try_spend(self):
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+# Per-host circuit breaker: closed -> open after consecutive failures -> half-open probes -> closed
+class CircuitBreaker:
+    def __init__(self, host):
+        self.host = host
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+
+    # Whether a request may be sent right now; reserves a probe slot while half-open
+    def allow(self):
+        if self.state == "open":
+            if clock.monotonic() - self.opened_at < BREAKER_OPEN_SECONDS:
+                return False
+            self.state = "half-open"
+            self.probes = 0
+
+        if self.state == "half-open":
+            if self.probes >= BREAKER_HALF_OPEN_PROBES:
+                return False
+            self.probes += 1
+
+        return True
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self.probes = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half-open" or self.failures >= BREAKER_FAILURE_THRESHOLD:
+            self.state = "open"
+            self.opened_at = clock.monotonic()
+            self.probes = 0
+
+    # Outcome that says nothing about the host (e.g. a broken proxy); only frees the probe slot
+    def record_neutral(self):
+        if self.state == "half-open":
+            self.probes = max(self.probes - 1, 0)
+
+retry_budget = RetryBudget()
+circuit_breakers = {}
+
+# Return the circuit breaker of the URL's host
+def get_breaker(url):
+    host = get_host(url)
+    breaker = circuit_breakers.get(host)
+    if breaker is None:
+        breaker = circuit_breakers[host] = CircuitBreaker(host)
+    return breaker
+
+# Maximum number of attempts for an endpoint name from DOMAIN_API
+def get_max_attempts(endpoint):
+    return ENDPOINT_MAX_ATTEMPTS.get(endpoint, MAX_ATTEMPTS)
+
+# Full-jitter exponential backoff delay for the given attempt number
+def backoff_delay(attempt, base_delay=BACKOFF_BASE):
+    return random.uniform(0, min(base_delay * (2 ** attempt), BACKOFF_MAX))
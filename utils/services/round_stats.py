@@ -0,0 +1,66 @@
+from utils.settings import logger, Fore
+
+
+# Counters for the current ping round, reset every time a round is published
+round_stats = {"pings": 0, "success": 0, "failed": 0, "retries": 0, "points": 0, "latencies": []}
+
+# Callbacks receiving a copy of the counters at the end of every round
+round_listeners = []
+
+# Count the outcome of a single ping and how long it took, retries included
+def record_ping(result, latency=None):
+    round_stats["pings"] += 1
+    round_stats["success" if result == "success" else "failed"] += 1
+    if latency is not None:
+        round_stats["latencies"].append(latency)
+
+# Count a request that is about to be retried
+def record_retry():
+    round_stats["retries"] += 1
+
+# Count points earned from claimed rewards
+def record_points(points):
+    if isinstance(points, (int, float)):
+        round_stats["points"] += points
+
+# Register a callback to be called with the statistics of each finished round
+def add_round_listener(listener):
+    round_listeners.append(listener)
+
+# Hand the finished round to every listener and start counting a new one
+def publish_round():
+    stats = dict(round_stats)
+    for key, value in round_stats.items():
+        round_stats[key] = [] if isinstance(value, list) else 0
+
+    for listener in round_listeners:
+        listener(stats)
+    return stats
+
+# Add the counters of one round to a running total
+def merge_stats(total, stats):
+    for key, value in stats.items():
+        if isinstance(value, list):
+            total.setdefault(key, []).extend(value)
+        elif isinstance(value, (int, float)):
+            total[key] = total.get(key, 0) + value
+    return total
+
+# Nearest-rank percentile of an already sorted list
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+# Log one digest line for a round; bound as a summary so it stays visible in summary mode
+def log_round_summary(stats, label="Round summary"):
+    latencies = sorted(stats.get("latencies", []))
+    logger.bind(summary=True).info(
+        f"{Fore.CYAN}00{Fore.RESET} - {label}: "
+        f"Pings {Fore.CYAN}{stats.get('pings', 0)}{Fore.RESET}, "
+        f"Success {Fore.GREEN}{stats.get('success', 0)}{Fore.RESET}, "
+        f"Failed {Fore.RED}{stats.get('failed', 0)}{Fore.RESET}, "
+        f"Retrying {Fore.YELLOW}{stats.get('retries', 0)}{Fore.RESET}, "
+        f"Latency p50/p95/p99 {Fore.CYAN}{percentile(latencies, 0.5):.2f}/{percentile(latencies, 0.95):.2f}/{percentile(latencies, 0.99):.2f}s{Fore.RESET}, "
+        f"Points {Fore.GREEN}{stats.get('points', 0)}{Fore.RESET}"
+    )
@@ -0,0 +1,21 @@
+import asyncio
+
+from utils.settings import ACCELERATED_RUNTIME, DEBUG, logger, Fore
+from utils.services.codec import USE_ORJSON
+
+
+# Make new event loops uvloop ones when ACCELERATED_RUNTIME is set and uvloop is installed; call before asyncio.run
+def install_event_loop():
+    if not ACCELERATED_RUNTIME:
+        return "asyncio"
+
+    try:
+        import uvloop
+    except ImportError:
+        logger.warning(f"{Fore.CYAN}00{Fore.RESET} - {Fore.YELLOW}ACCELERATED_RUNTIME is set but uvloop is not installed; using the default event loop{Fore.RESET}")
+        return "asyncio"
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    if DEBUG:
+        logger.debug(f"{Fore.CYAN}00{Fore.RESET} - Using uvloop event loop, {'orjson' if USE_ORJSON else 'stdlib json'} codec")
+    return "uvloop"
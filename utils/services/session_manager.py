@@ -0,0 +1,78 @@
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from curl_cffi.requests import AsyncSession
+from urllib.parse import urlparse
+
+from utils.services import clock
+from utils.settings import MAX_CONNECTIONS_PER_ROUTE, SESSION_IDLE_TIMEOUT
+
+
+# Pooled sessions keyed by (host, proxy) so keep-alive connections are reused per route
+session_pool = {}
+last_eviction = clock.monotonic()
+
+# In-process stand-in with the session's get/post interface, used instead of the network when set
+request_transport = None
+
+# Route every request through the given stand-in transport, or back to the network with None
+def set_transport(transport):
+    global request_transport
+    request_transport = transport
+
+def get_transport():
+    return request_transport
+
+# Create a new session bound to a single route
+def create_session(proxy=None):
+    proxies = {"http": proxy, "https": proxy} if proxy else None
+    return AsyncSession(max_clients=MAX_CONNECTIONS_PER_ROUTE, impersonate="safari15_5", proxies=proxies)
+
+# Parse the host of a URL once; the set of endpoint URLs is small and fixed
+@lru_cache(maxsize=None)
+def get_host(url):
+    return urlparse(url).hostname
+
+# Borrow the pooled session for the route of the given URL and proxy
+@asynccontextmanager
+async def acquire_session(url, proxy=None):
+    if request_transport is not None:
+        yield request_transport
+        return
+
+    route = (get_host(url), proxy)
+    entry = session_pool.get(route)
+
+    if entry is None:
+        entry = session_pool[route] = {"session": create_session(proxy), "in_use": 0, "last_used": clock.monotonic()}
+
+    entry["in_use"] += 1
+    try:
+        yield entry["session"]
+    finally:
+        entry["in_use"] -= 1
+        entry["last_used"] = clock.monotonic()
+
+    await evict_idle_sessions()
+
+# Close sessions whose route has been idle longer than SESSION_IDLE_TIMEOUT
+async def evict_idle_sessions():
+    global last_eviction
+
+    now = clock.monotonic()
+    if now - last_eviction < SESSION_IDLE_TIMEOUT / 2:
+        return
+    last_eviction = now
+
+    idle_routes = [
+        route for route, entry in session_pool.items()
+        if entry["in_use"] == 0 and now - entry["last_used"] > SESSION_IDLE_TIMEOUT
+    ]
+    for route in idle_routes:
+        entry = session_pool.pop(route)
+        await entry["session"].close()
+
+# Close every pooled session and release its connections
+async def close_sessions():
+    while session_pool:
+        _, entry = session_pool.popitem()
+        await entry["session"].close()
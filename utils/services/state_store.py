@@ -0,0 +1,167 @@
+import asyncio
+import json
+import sqlite3
+import threading
+
+from utils.services.response_cache import cache_response
+from utils.settings import STATE_FILE, STATE_FLUSH_INTERVAL, CONNECTION_STATES, logger, Fore
+
+
+# Accounts changed since the last flush, written to disk in batches by the background writer
+dirty_accounts = {}
+writer_task = None
+connection = None
+write_lock = threading.Lock()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS account_state (
+    token TEXT PRIMARY KEY,
+    account_info TEXT NOT NULL,
+    account_info_updated REAL,
+    claimed_rewards TEXT NOT NULL,
+    last_ping_time REAL,
+    activated INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+COLUMNS = "token, account_info, account_info_updated, claimed_rewards, last_ping_time, activated"
+
+# Open the state database, creating the table on first use and adding columns missing from older databases
+def get_connection():
+    global connection
+
+    if connection is None:
+        connection = sqlite3.connect(STATE_FILE, timeout=30, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(SCHEMA)
+        existing = {row[1] for row in connection.execute("PRAGMA table_info(account_state)")}
+        if "activated" not in existing:
+            connection.execute("ALTER TABLE account_state ADD COLUMN activated INTEGER NOT NULL DEFAULT 0")
+        connection.commit()
+    return connection
+
+# Tokens looked up per query, below SQLite's limit on bound parameters
+LOAD_CHUNK_SIZE = 500
+
+# Load the saved state of the given tokens, looked up by primary key so a reload of a few tokens stays cheap
+def load_state(tokens):
+    if not STATE_FILE:
+        return {}
+
+    tokens = list(tokens)
+    rows = []
+    try:
+        for start in range(0, len(tokens), LOAD_CHUNK_SIZE):
+            chunk = tokens[start:start + LOAD_CHUNK_SIZE]
+            rows += get_connection().execute(
+                f"SELECT {COLUMNS} FROM account_state "
+                f"WHERE token IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"{Fore.CYAN}00{Fore.RESET} - {Fore.RED}Failed to load saved state:{Fore.RESET} {e}")
+        return {}
+
+    return {
+        token: {
+            "account_info": json.loads(account_info),
+            "account_info_updated": account_info_updated,
+            "claimed_rewards": set(json.loads(claimed_rewards)),
+            "last_ping_time": last_ping_time,
+            "activated": bool(activated),
+        }
+        for token, account_info, account_info_updated, claimed_rewards, last_ping_time, activated in rows
+    }
+
+# Apply saved state to freshly created accounts; returns how many were restored
+def restore_accounts(accounts):
+    state = load_state(account.token for account in accounts)
+    restored = 0
+
+    for account in accounts:
+        saved = state.get(account.token)
+        if not saved:
+            continue
+
+        account.account_info = saved["account_info"]
+        account.account_info_updated = saved["account_info_updated"]
+        if account.account_info and account.account_info_updated:
+            cache_response(account, "SESSION", {"success": True, "data": account.account_info}, account.account_info_updated)
+        account.claimed_rewards = saved["claimed_rewards"]
+        account.browser_ids[0].last_ping_time = saved["last_ping_time"]
+
+        # Activation is a one-off on the API side, so a warm restart does not repeat it
+        if saved["activated"]:
+            account.status_connect = CONNECTION_STATES["CONNECTED"]
+        restored += 1
+
+    return restored
+
+# Queue an account for the next batched write
+def mark_dirty(account):
+    if STATE_FILE:
+        dirty_accounts[account.token] = account
+
+# Serialize the queued accounts; runs on the event loop so the rows are a consistent snapshot
+def collect_dirty_rows():
+    rows = [
+        (
+            token,
+            json.dumps(account.account_info),
+            account.account_info_updated,
+            json.dumps(sorted(account.claimed_rewards)),
+            account.browser_ids[0].last_ping_time,
+            account.status_connect == CONNECTION_STATES["CONNECTED"],
+        )
+        for token, account in dirty_accounts.items()
+    ]
+    dirty_accounts.clear()
+    return rows
+
+# Write a batch of rows in a single transaction
+def write_rows(rows):
+    with write_lock:
+        db = get_connection()
+        with db:
+            db.executemany(f"INSERT OR REPLACE INTO account_state ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+# Flush queued accounts on a worker thread so the event loop never waits on disk I/O
+async def flush_state():
+    if not dirty_accounts:
+        return
+
+    rows = collect_dirty_rows()
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, write_rows, rows)
+    except sqlite3.Error as e:
+        logger.error(f"{Fore.CYAN}00{Fore.RESET} - {Fore.RED}Failed to save state:{Fore.RESET} {e}")
+
+# Background writer flushing queued accounts every STATE_FLUSH_INTERVAL seconds
+async def run_state_writer():
+    while True:
+        await asyncio.sleep(STATE_FLUSH_INTERVAL)
+        await flush_state()
+
+# Start the background writer if the state store is enabled
+def start_state_writer():
+    global writer_task
+
+    if STATE_FILE and writer_task is None:
+        writer_task = asyncio.create_task(run_state_writer())
+
+# Stop the background writer, flush what is left and close the database
+async def close_state_store():
+    global writer_task, connection
+
+    if writer_task is not None:
+        writer_task.cancel()
+        await asyncio.gather(writer_task, return_exceptions=True)
+        writer_task = None
+
+    if STATE_FILE:
+        await flush_state()
+
+    with write_lock:
+        if connection is not None:
+            connection.close()
+            connection = None
@@ -1,26 +1,101 @@
 import asyncio
+import os
+import sys
 
-from utils.settings import logger, Fore
+from utils.settings import TOKENS_FILE, TOKENS_RELOAD_INTERVAL, logger, Fore
 
 
 # Track processed tokens globally
 processed_tokens = set()
 lock = asyncio.Lock()
 
+# Background task polling the tokens file for changes
+watcher_task = None
+
 # Masks sensitive parts of a token
 def mask_token(token):
     return f"{token[:5]}--{token[-5:]}"
 
+# Stream tokens from the file one line at a time; interning makes a re-read share the strings live accounts hold
+def iter_tokens():
+    with open(TOKENS_FILE, 'r') as file:
+        for line in file:
+            token = line.strip()
+            if token:
+                yield sys.intern(token)
+
 # Load tokens from a file
 async def load_tokens():
     try:
-        with open('tokens.txt', 'r') as file:
-            tokens = file.read().splitlines()
-        return tokens
+        return list(iter_tokens())
     except Exception as e:
         logger.error(f"{Fore.CYAN}00{Fore.RESET} - {Fore.RED}Error loading tokens: {e}{Fore.RESET}")
         raise SystemExit("Exiting due to failure in loading tokens")
 
+# Modification time of the tokens file, or None while it is missing
+def tokens_mtime():
+    try:
+        return os.stat(TOKENS_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+# Re-read the tokens file and return (added, removed, current) against the known tokens, or None if it changed while being read
+def diff_tokens(known, mtime):
+    current = set(iter_tokens())
+    if tokens_mtime() != mtime:
+        return None
+    return [token for token in current if token not in known], [token for token in known if token not in current], current
+
+# Poll the tokens file by mtime and hand every change to on_change(added, removed)
+async def watch_tokens(known, on_change):
+    mtime = tokens_mtime()
+
+    while True:
+        await asyncio.sleep(TOKENS_RELOAD_INTERVAL)
+        current_mtime = tokens_mtime()
+        if current_mtime is None or current_mtime == mtime:
+            continue
+
+        try:
+            diff = diff_tokens(known, current_mtime)
+        except OSError as e:
+            logger.error(f"{Fore.CYAN}00{Fore.RESET} - {Fore.RED}Error reloading tokens: {e}{Fore.RESET}")
+            continue
+
+        # Still being written: pick it up on the next check
+        if diff is None:
+            continue
+        added, removed, current = diff
+        mtime = current_mtime
+
+        # An emptied file is far more likely a botched edit than a request to stop every account
+        if not current:
+            logger.warning(f"{Fore.CYAN}00{Fore.RESET} - {Fore.YELLOW}{TOKENS_FILE} is empty; keeping the running accounts{Fore.RESET}")
+            continue
+
+        known = current
+        if added or removed:
+            try:
+                await on_change(added, removed)
+            except Exception as e:
+                logger.error(f"{Fore.CYAN}00{Fore.RESET} - {Fore.RED}Error applying reloaded tokens: {e}{Fore.RESET}")
+
+# Start watching the tokens file unless TOKENS_RELOAD_INTERVAL is 0; known holds the tokens already loaded
+def start_token_watcher(known, on_change):
+    global watcher_task
+
+    if TOKENS_RELOAD_INTERVAL > 0 and watcher_task is None:
+        watcher_task = asyncio.create_task(watch_tokens(set(known), on_change))
+
+# Stop watching the tokens file
+async def stop_token_watcher():
+    global watcher_task
+
+    if watcher_task is not None:
+        watcher_task.cancel()
+        await asyncio.gather(watcher_task, return_exceptions=True)
+        watcher_task = None
+
 # Function to add a token to the processed list
 async def mark_token(account):
     async with lock:
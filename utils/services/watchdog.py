@@ -0,0 +1,81 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+
+from utils.services.metrics import loop_lag, loop_stalls
+from utils.settings import LOOP_LAG_THRESHOLD, LOOP_LAG_INTERVAL, logger, Fore
+
+
+# Watches the event loop from a task (lag of each wake-up) and from a thread (stack of the code blocking it)
+class LoopWatchdog:
+    def __init__(self, threshold=LOOP_LAG_THRESHOLD, interval=LOOP_LAG_INTERVAL):
+        self.threshold = threshold
+        self.interval = interval
+        self.heartbeat = time.monotonic()
+        self.loop_thread_id = threading.get_ident()
+        self.stopped = threading.Event()
+        self.task = None
+        self.thread = None
+
+    def start(self):
+        self.task = asyncio.create_task(self.sample())
+        self.thread = threading.Thread(target=self.watch, name="loop-watchdog", daemon=True)
+        self.thread.start()
+
+    # Sleep for the interval and measure how late the loop woke up
+    async def sample(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self.heartbeat = time.monotonic()
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+
+            lag = max(loop.time() - expected, 0.0)
+            loop_lag.observe(value=lag)
+            if lag >= self.threshold:
+                logger.warning(f"{Fore.CYAN}00{Fore.RESET} - {Fore.YELLOW}Event loop was blocked for {lag:.2f}s{Fore.RESET}")
+
+    # Runs in its own thread: while the heartbeat is stale, report what the loop thread is executing
+    def watch(self):
+        reported = None
+        while not self.stopped.wait(self.threshold / 2):
+            heartbeat = self.heartbeat
+            stalled = time.monotonic() - heartbeat - self.interval
+            if stalled < self.threshold or reported == heartbeat:
+                continue
+            reported = heartbeat
+
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            loop_stalls.inc()
+            stack = "".join(traceback.format_stack(frame)).rstrip()
+            logger.warning(f"{Fore.CYAN}00{Fore.RESET} - {Fore.YELLOW}Event loop blocked for over {stalled:.2f}s in:{Fore.RESET}\n{stack}")
+
+    async def stop(self):
+        self.stopped.set()
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+        if self.thread is not None:
+            self.thread.join()
+
+loop_watchdog = None
+
+# Start watching the running loop unless LOOP_LAG_THRESHOLD is 0
+def start_watchdog():
+    global loop_watchdog
+
+    if LOOP_LAG_THRESHOLD > 0 and loop_watchdog is None:
+        loop_watchdog = LoopWatchdog()
+        loop_watchdog.start()
+
+# Stop the watchdog task and thread
+async def stop_watchdog():
+    global loop_watchdog
+
+    if loop_watchdog is not None:
+        await loop_watchdog.stop()
+        loop_watchdog = None
@@ -0,0 +1,94 @@
+import asyncio
+
+from utils.settings import MAX_CONCURRENCY, QUEUE_SIZE, logger, Fore
+
+
+# Shared pool, created lazily inside the running event loop
+worker_pool = None
+
+# Tracks completion of a group of jobs submitted together
+class JobBatch:
+    def __init__(self):
+        self.pending = 0
+        self.done = asyncio.Event()
+        self.done.set()
+
+    def add(self):
+        self.pending += 1
+        self.done.clear()
+
+    def finish(self):
+        self.pending -= 1
+        if self.pending == 0:
+            self.done.set()
+
+    async def wait(self):
+        await self.done.wait()
+
+# Fixed number of workers consuming (function, args) jobs from a bounded queue
+class WorkerPool:
+    def __init__(self, size=MAX_CONCURRENCY, queue_size=QUEUE_SIZE):
+        self.size = size
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.workers = []
+        self.active = 0
+
+    def start(self):
+        if not self.workers:
+            self.workers = [asyncio.create_task(self.worker()) for _ in range(self.size)]
+
+    async def worker(self):
+        while True:
+            func, args, batch = await self.queue.get()
+            self.active += 1
+            try:
+                await func(*args)
+            except Exception as e:
+                logger.error(f"{Fore.CYAN}00{Fore.RESET} - {Fore.RED}Worker job {func.__name__} failed:{Fore.RESET} {e}")
+            finally:
+                self.active -= 1
+                self.queue.task_done()
+                if batch is not None:
+                    batch.finish()
+
+    # Queue a job, waiting for room when the queue is full
+    async def submit(self, func, *args, batch=None):
+        self.start()
+        if batch is not None:
+            batch.add()
+        await self.queue.put((func, args, batch))
+
+    # Run func for every item through the pool and wait until all of them are done
+    async def map(self, func, items):
+        batch = JobBatch()
+        for item in items:
+            await self.submit(func, item, batch=batch)
+        await batch.wait()
+
+    def report(self, label):
+        logger.info(
+            f"{Fore.CYAN}00{Fore.RESET} - {label}: queue depth {Fore.CYAN}{self.queue.qsize()}/{self.queue.maxsize}{Fore.RESET}, "
+            f"active workers {Fore.CYAN}{self.active}/{self.size}{Fore.RESET}"
+        )
+
+    async def close(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+# Return the shared worker pool, creating it on first use
+def get_worker_pool():
+    global worker_pool
+
+    if worker_pool is None:
+        worker_pool = WorkerPool()
+    return worker_pool
+
+# Stop the shared worker pool
+async def close_worker_pool():
+    global worker_pool
+
+    if worker_pool is not None:
+        await worker_pool.close()
+        worker_pool = None
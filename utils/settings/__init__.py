@@ -1,4 +1,18 @@
 from .logger_setup import logger, Fore, init, setup_logging, startup_art
 from .config import DOMAIN_API, CONNECTION_STATES
 from .config import ACTIVATE_ACCOUNTS, DAILY_CLAIM
-from .config import PING_INTERVAL, PING_DURATION, DEBUG
\ No newline at end of file
+from .config import PING_INTERVAL, PING_DURATION, DEBUG
+from .config import TOKENS_FILE, PROXIES_FILE, USE_PROXIES, TOKENS_RELOAD_INTERVAL, IP_LOOKUP_URL
+from .config import LOG_JSON_FILE, LOG_ROTATION, LOG_RETENTION, LOG_MODE, LOG_FILE
+from .config import METRICS_PORT, METRICS_HOST
+from .config import LOOP_LAG_THRESHOLD, LOOP_LAG_INTERVAL
+from .config import ACCELERATED_RUNTIME
+from .config import MAX_CONNECTIONS_PER_ROUTE, SESSION_IDLE_TIMEOUT, IP_CACHE_TTL
+from .config import MAX_CONCURRENCY, QUEUE_SIZE
+from .config import STATE_FILE, STATE_FLUSH_INTERVAL
+from .config import SESSION_CACHE_TTL, EARN_INFO_CACHE_TTL, MISSION_CACHE_TTL
+from .config import REQUEST_TIMEOUT_MIN, REQUEST_TIMEOUT_MAX, TIMEOUT_MULTIPLIER, LATENCY_WINDOW, PING_HEDGE
+from .config import MAX_ATTEMPTS, ENDPOINT_MAX_ATTEMPTS, BACKOFF_BASE, BACKOFF_MAX, RETRY_BUDGET_RATIO, RETRY_BUDGET_MIN
+from .config import ACCOUNT_FAILURE_THRESHOLD, ACCOUNT_COOLDOWN_BASE, ACCOUNT_COOLDOWN_MAX, QUARANTINE_FILE
+from .config import BREAKER_FAILURE_THRESHOLD, BREAKER_OPEN_SECONDS, BREAKER_HALF_OPEN_PROBES
+from .config import RATE_LIMIT_PER_HOST, RATE_LIMIT_BURST, RATE_LIMIT_MIN, RATE_LIMIT_RECOVERY
\ No newline at end of file
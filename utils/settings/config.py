@@ -12,25 +12,116 @@ DAILY_CLAIM = os.getenv('DAILY_CLAIM', 'True') == 'True'
 PING_INTERVAL = int(os.getenv('PING_INTERVAL', 60))
 PING_DURATION = int(os.getenv('PING_DURATION', 1800))
 
+# Input files
+TOKENS_FILE = os.getenv('TOKENS_FILE', 'tokens.txt')
+PROXIES_FILE = os.getenv('PROXIES_FILE', 'proxies.txt')
+
+# Answer to the proxy prompt ("true"/"false"); unset asks interactively, or runs without proxies when there is no terminal
+USE_PROXIES = {'true': True, 'false': False}.get(os.getenv('USE_PROXIES', '').strip().lower())
+
+# Seconds between checks of TOKENS_FILE for added or removed tokens (0 disables reloading)
+TOKENS_RELOAD_INTERVAL = float(os.getenv('TOKENS_RELOAD_INTERVAL', 10))
+
+# HTTP transport
+MAX_CONNECTIONS_PER_ROUTE = int(os.getenv('MAX_CONNECTIONS_PER_ROUTE', 1000))
+SESSION_IDLE_TIMEOUT = int(os.getenv('SESSION_IDLE_TIMEOUT', 300))
+IP_CACHE_TTL = int(os.getenv('IP_CACHE_TTL', 900))
+
+# Worker pool
+MAX_CONCURRENCY = int(os.getenv('MAX_CONCURRENCY', 500))
+QUEUE_SIZE = int(os.getenv('QUEUE_SIZE', 1000))
+
+# Local state store (set STATE_FILE to an empty value to disable)
+STATE_FILE = os.getenv('STATE_FILE', 'state.db').strip()
+STATE_FLUSH_INTERVAL = int(os.getenv('STATE_FLUSH_INTERVAL', 5))
+
+# Response cache lifetimes (seconds) for profile, earning and mission data
+SESSION_CACHE_TTL = int(os.getenv('SESSION_CACHE_TTL', 21600))
+EARN_INFO_CACHE_TTL = int(os.getenv('EARN_INFO_CACHE_TTL', 3600))
+MISSION_CACHE_TTL = int(os.getenv('MISSION_CACHE_TTL', 3600))
+
 # Debugging
 DEBUG = os.getenv('DEBUG', 'False').strip().lower() == 'true'
 
+# Console output: "detailed" logs every account, "summary" shows per-round digests and failures only
+LOG_MODE = os.getenv('LOG_MODE', 'detailed').strip().lower()
+LOG_FILE = os.getenv('LOG_FILE', 'nodepay.log' if LOG_MODE == 'summary' else '').strip()
+
+# Optional structured JSON log file; log files are rotated by size
+LOG_JSON_FILE = os.getenv('LOG_JSON_FILE', '').strip()
+LOG_ROTATION = os.getenv('LOG_ROTATION', '50 MB')
+LOG_RETENTION = int(os.getenv('LOG_RETENTION', 5))
+
+# Prometheus metrics endpoint on METRICS_HOST:METRICS_PORT/metrics (0 disables it; shards use consecutive ports)
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+
+# API hosts; point them at benchmarks/mock_server.py to run without the real service.
+# PING_BASE_URL may list several comma-separated hosts, tried in order (or hedged with PING_HEDGE)
+API_BASE_URL = os.getenv('API_BASE_URL', 'https://api.nodepay.ai').rstrip('/')
+PING_BASE_URLS = [url.strip().rstrip('/') for url in os.getenv('PING_BASE_URL', 'https://nw.nodepay.org').split(',') if url.strip()]
+IP_LOOKUP_URL = os.getenv('IP_LOOKUP_URL', 'https://api.ipify.org?format=json')
+
+# Event-loop watchdog: warn with the blocking stack when the loop stalls this many seconds (0 disables it)
+LOOP_LAG_THRESHOLD = float(os.getenv('LOOP_LAG_THRESHOLD', 0.5))
+LOOP_LAG_INTERVAL = float(os.getenv('LOOP_LAG_INTERVAL', 0.25))
+
+# Use uvloop and orjson when they are installed (both optional, the stdlib is used otherwise)
+ACCELERATED_RUNTIME = os.getenv('ACCELERATED_RUNTIME', 'False').strip().lower() == 'true'
+
 # Nodepay API endpoints
 DOMAIN_API = {
 
     # Auth Endpoints
-    "ACTIVATE": "https://api.nodepay.ai/api/auth/active-account",
+    "ACTIVATE": f"{API_BASE_URL}/api/auth/active-account",
 
     # Network Endpoints
-    "PING": ["https://nw.nodepay.org/api/network/ping"],
-    "SESSION": "https://api.nodepay.ai/api/auth/session",
+    "PING": [f"{base_url}/api/network/ping" for base_url in PING_BASE_URLS],
+    "SESSION": f"{API_BASE_URL}/api/auth/session",
 
     # Earn and Mission Endpoints
-    "EARN_INFO": "https://api.nodepay.ai/api/earn/info",
-    "MISSION": "https://api.nodepay.ai/api/mission?platform=MOBILE",
-    "COMPLETE_MISSION": "https://api.nodepay.ai/api/mission/complete-mission"
+    "EARN_INFO": f"{API_BASE_URL}/api/earn/info",
+    "MISSION": f"{API_BASE_URL}/api/mission?platform=MOBILE",
+    "COMPLETE_MISSION": f"{API_BASE_URL}/api/mission/complete-mission"
 }
 
+# Request timeouts adapt to each endpoint's observed p99 times TIMEOUT_MULTIPLIER, within these bounds (seconds)
+REQUEST_TIMEOUT_MIN = float(os.getenv('REQUEST_TIMEOUT_MIN', 5))
+REQUEST_TIMEOUT_MAX = float(os.getenv('REQUEST_TIMEOUT_MAX', 120))
+TIMEOUT_MULTIPLIER = float(os.getenv('TIMEOUT_MULTIPLIER', 3))
+LATENCY_WINDOW = int(os.getenv('LATENCY_WINDOW', 200))
+
+# Send a second ping to the next PING URL when the first has not answered by its p95
+PING_HEDGE = os.getenv('PING_HEDGE', 'False').strip().lower() == 'true'
+
+# Retry policy: attempts per request (overridable per endpoint, e.g. MAX_ATTEMPTS_PING), backoff and retry budget
+MAX_ATTEMPTS = int(os.getenv('MAX_ATTEMPTS', 3))
+ENDPOINT_MAX_ATTEMPTS = {name: int(os.getenv(f'MAX_ATTEMPTS_{name}', MAX_ATTEMPTS)) for name in DOMAIN_API}
+BACKOFF_BASE = float(os.getenv('BACKOFF_BASE', 1))
+BACKOFF_MAX = float(os.getenv('BACKOFF_MAX', 30))
+RETRY_BUDGET_RATIO = float(os.getenv('RETRY_BUDGET_RATIO', 0.1))
+RETRY_BUDGET_MIN = int(os.getenv('RETRY_BUDGET_MIN', 10))
+
+# Account health: after this many consecutive failed requests an account cools down for
+# ACCOUNT_COOLDOWN_BASE seconds, doubling with each further failure up to ACCOUNT_COOLDOWN_MAX
+ACCOUNT_FAILURE_THRESHOLD = int(os.getenv('ACCOUNT_FAILURE_THRESHOLD', 3))
+ACCOUNT_COOLDOWN_BASE = float(os.getenv('ACCOUNT_COOLDOWN_BASE', 60))
+ACCOUNT_COOLDOWN_MAX = float(os.getenv('ACCOUNT_COOLDOWN_MAX', 3600))
+
+# Tokens rejected with 401/403 are quarantined: written here and skipped on later starts (empty keeps them in memory only)
+QUARANTINE_FILE = os.getenv('QUARANTINE_FILE', 'quarantined.txt').strip()
+
+# Circuit breaker per API host
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', 20))
+BREAKER_OPEN_SECONDS = int(os.getenv('BREAKER_OPEN_SECONDS', 30))
+BREAKER_HALF_OPEN_PROBES = int(os.getenv('BREAKER_HALF_OPEN_PROBES', 3))
+
+# Shared token-bucket rate limit per API host in requests per second (0 disables it)
+RATE_LIMIT_PER_HOST = float(os.getenv('RATE_LIMIT_PER_HOST', 100))
+RATE_LIMIT_BURST = int(os.getenv('RATE_LIMIT_BURST', 100))
+RATE_LIMIT_MIN = float(os.getenv('RATE_LIMIT_MIN', 1))
+RATE_LIMIT_RECOVERY = float(os.getenv('RATE_LIMIT_RECOVERY', 0.1))
+
 # Connection states to track account status
 CONNECTION_STATES = {
     "NONE_CONNECTION": 3,
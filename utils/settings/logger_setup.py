@@ -1,3 +1,4 @@
+import json
 import re
 import sys
 
@@ -5,7 +6,8 @@ from loguru import logger
 from textwrap import fill
 from colorama import Fore, Style, init
 
-from utils.settings.config import DEBUG
+from utils.settings.config import DEBUG, LOG_JSON_FILE, LOG_ROTATION, LOG_RETENTION, LOG_MODE, LOG_FILE
+from utils.settings.config import TOKENS_FILE, PROXIES_FILE
 
 
 # Initialize colorama
@@ -28,6 +30,14 @@ Total Tokens: {total_tokens}     |     Total Proxies: {total_proxies}
 ------------------------------------------------------------
 """
 
+# Precompiled pattern for ANSI color codes and the width messages are wrapped to
+ANSI_PATTERN = re.compile(r'\033\[.*?m')
+WRAP_WIDTH = 120
+
+# Lines that are not about a single account start with the "00" index
+GLOBAL_PREFIX = f"{Fore.CYAN}00{Fore.RESET}"
+WARNING_LEVEL = logger.level("WARNING").no
+
 # Reads file and counts lines
 def count_lines(file_path):
     try:
@@ -38,15 +48,47 @@ def count_lines(file_path):
 
 # Wraps messages to fit within the allowed width
 def wrap_message(record):
-    if record["message"].startswith(Fore.CYAN) and "-" in record["message"]:
+    message = record["message"]
+    if message.startswith(Fore.CYAN) and "-" in message:
         return True
-    
-    message_without_color = re.sub(r'\033\[.*?m', '', record["message"])
-    wrapped_message = fill(message_without_color, width=120)
-    record["message"] = wrapped_message
-    
+
+    if "\033" in message:
+        message = ANSI_PATTERN.sub('', message)
+
+    # Short single-line messages come out of fill() unchanged, so skip it
+    if len(message) > WRAP_WIDTH or "\n" in message:
+        message = fill(message, width=WRAP_WIDTH)
+
+    record["message"] = message
     return True
 
+# Summary mode: keep global lines, round digests and warnings/errors on the console
+def summary_filter(record):
+    if (
+        record["level"].no >= WARNING_LEVEL
+        or record["extra"].get("summary")
+        or record["message"].startswith(GLOBAL_PREFIX)
+    ):
+        return wrap_message(record)
+    return False
+
+# Formats a record as a plain text line for the detail log file
+def format_plain(record):
+    record["extra"]["plain"] = ANSI_PATTERN.sub('', record["message"])
+    return "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {extra[plain]}\n"
+
+# Formats a record as one JSON line for the structured file sink
+def format_json(record):
+    record["extra"]["json"] = json.dumps({
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "module": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "message": ANSI_PATTERN.sub('', record["message"]),
+    }, ensure_ascii=False)
+    return "{extra[json]}\n"
+
 # Setup logging configuration
 def setup_logging():
     logger.remove()
@@ -56,15 +98,39 @@ def setup_logging():
         format="<magenta>[Nodepay]</magenta> | {time:YYYY-MM-DD HH:mm:ss} | {message}",
         colorize=True,
         enqueue=True,
-        filter=wrap_message,
+        filter=summary_filter if LOG_MODE == "summary" else wrap_message,
         level=log_level
     )
 
-# Function to display the startup art
-def startup_art():
-    total_tokens = count_lines('tokens.txt')
-    total_proxies = count_lines('proxies.txt')
-    
+    # Full per-account detail, mainly for summary mode where the console only shows digests and failures
+    if LOG_FILE:
+        logger.add(
+            sink=LOG_FILE,
+            format=format_plain,
+            rotation=LOG_ROTATION,
+            retention=LOG_RETENTION,
+            enqueue=True,
+            level=log_level
+        )
+
+    # Optional structured log; enqueue=True hands the writes and rotation to loguru's background thread
+    if LOG_JSON_FILE:
+        logger.add(
+            sink=LOG_JSON_FILE,
+            format=format_json,
+            rotation=LOG_ROTATION,
+            retention=LOG_RETENTION,
+            enqueue=True,
+            level=log_level
+        )
+
+# Function to display the startup art; callers that already loaded the files pass their counts
+def startup_art(total_tokens=None, total_proxies=None):
+    if total_tokens is None:
+        total_tokens = count_lines(TOKENS_FILE)
+    if total_proxies is None:
+        total_proxies = count_lines(PROXIES_FILE)
+
     formatted_start_text = start_text.format(
         total_tokens=total_tokens,
         total_proxies=total_proxies